@@ -44,7 +44,47 @@ const uploadToBlob = async (uri, containerName = 'uploads', blobName = `${Date.n
   }
 };
 
-const insertIntoTable = async ({ tableName, entity, action = "create" }) => {
+// Uploads straight to storage with a short-lived SAS instead of through the function app
+const uploadDirect = async (uri, containerName = 'uploads', blobName = `${Date.now()}.png`) => {
+  const base = local ? 'http://localhost:7071/api' : 'https://functionappdatingiot.azurewebsites.net/api';
+  try {
+    const blob = await (await fetch(uri)).blob();
+    const grantResponse = await fetch(`${base}/getuploadsas`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        container_name: containerName,
+        blob_name: blobName,
+        content_type: blob.type || 'image/png',
+        size: blob.size,
+      }),
+    });
+    if (!grantResponse.ok) {
+      throw new Error(await grantResponse.text());
+    }
+    const grant = await grantResponse.json();
+
+    const putResponse = await fetch(grant.upload_url, { method: 'PUT', headers: grant.headers, body: blob });
+    if (!putResponse.ok) {
+      throw new Error(`Upload failed with status ${putResponse.status}`);
+    }
+
+    const completeResponse = await fetch(`${base}/completeupload`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ container_name: containerName, blob_name: blobName }),
+    });
+    if (!completeResponse.ok) {
+      throw new Error(await completeResponse.text());
+    }
+    return (await completeResponse.json()).url;
+  } catch (error) {
+    console.error('Error uploading to blob:', error);
+    throw error;
+  }
+};
+
+const insertIntoTable = async ({ tableName, entity, action = "create", etag }) => {
   console.log('Inserting into table:', tableName, entity);
   url = local ? 'http://localhost:7071/api/InsertIntoTable' : 'https://functionappdatingiot.azurewebsites.net/api/insertintotable';
   try {
@@ -57,6 +97,7 @@ const insertIntoTable = async ({ tableName, entity, action = "create" }) => {
         table_name: tableName,
         entity: entity,
         action: action,
+        etag: etag,
       }),
     });
     const text = await response.text();
@@ -67,7 +108,7 @@ const insertIntoTable = async ({ tableName, entity, action = "create" }) => {
   }
 };
 
-const readFromTable = async (tableName, queryFilter = '') => {
+const readFromTable = async (tableName, queryFilter = '', options = {}) => {
   console.log('Reading from table:', tableName, queryFilter);
   url = local ? 'http://localhost:7071/api/ReadFromTable' : 'https://functionappdatingiot.azurewebsites.net/api/ReadFromTable?';
   try {
@@ -79,6 +120,7 @@ const readFromTable = async (tableName, queryFilter = '') => {
       body: JSON.stringify({
         table_name: tableName,
         query_filter: queryFilter,
+        ...options,
       })
     });
     const json = await response.json();
@@ -112,24 +154,146 @@ const deleteFromTable = async ({ tableName, partitionKey, rowKey }) => {
   }
 };
 
-const saveMessage = async (user1, user2, message) => {
-  const users = [user1, user2].sort();
-  const partitionKey = `${users[0]};${users[1]}`;
-  const rowKey = `${Date.now()}`;
-  const entity = {
-    PartitionKey: partitionKey,
-    RowKey: rowKey,
-    User: user1,
-    Message: message,
-  };
-  return await insertIntoTable({ tableName: 'BarTable', entity });
+const batchTable = async ({ tableName, operations }) => {
+  console.log('Batching table operations:', tableName, operations.length);
+  url = local ? 'http://localhost:7071/api/BatchTable' : 'https://functionappdatingiot.azurewebsites.net/api/batchtable';
+  try {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        table_name: tableName,
+        operations: operations,
+      }),
+    });
+    const json = await response.json();
+    return json.results;
+  } catch (error) {
+    console.error('Error batching table operations:', error);
+    throw error;
+  }
 };
 
-const getMessages = async (user1, user2) => {
-  const users = [user1, user2].sort();
-  const partitionKey = `${users[0]};${users[1]}`;
-  const queryFilter = `PartitionKey eq '${partitionKey}'`;
-  return await readFromTable('BarTable', queryFilter);
+const getChatHistory = async ({ user, otherUser, limit = 50, before }) => {
+  url = local ? 'http://localhost:7071/api/ChatHistory' : 'https://functionappdatingiot.azurewebsites.net/api/chathistory';
+  try {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        user,
+        otherUser,
+        limit,
+        before,
+      }),
+    });
+    if (!response.ok) {
+      throw new Error(`Chat History Error: ${response.statusText}`);
+    }
+    return await response.json();
+  } catch (error) {
+    console.error('Error reading chat history:', error);
+    throw error;
+  }
+};
+
+// Claims (action 'add') or frees (action 'remove') a seat in one call; resolves
+// with the user's connected seats, or rejects with status 409 if the seat is taken
+const connectToSeat = async ({ user, bar, seat, action = 'add' }) => {
+  url = local ? 'http://localhost:7071/api/ConnectToSeat' : 'https://functionappdatingiot.azurewebsites.net/api/connecttoseat';
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ user, bar, seat, action }),
+  });
+  if (!response.ok) {
+    const error = new Error(await response.text());
+    error.status = response.status;
+    throw error;
+  }
+  return await response.json();
+};
+
+// Adds (or removes) a SignalR connection to a bar's seat-event group
+const joinBarGroup = async ({ bar, connectionId, user, leave = false }) => {
+  const name = leave ? 'LeaveBarGroup' : 'JoinBarGroup';
+  url = local ? `http://localhost:7071/api/${name}` : `https://functionappdatingiot.azurewebsites.net/api/${name.toLowerCase()}`;
+  try {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ bar, connectionId, user }),
+    });
+    if (!response.ok) {
+      throw new Error(`${name} Error: ${response.statusText}`);
+    }
+  } catch (error) {
+    console.error(`${name} Error:`, error);
+  }
+};
+
+// Stores a chat message with both users' summary rows and broadcasts it, in one call
+const sendChatMessage = async ({ user, otherUser, message, senderName, receiverName, timestamp, stringTimestamp, messageId }) => {
+  url = local ? 'http://localhost:7071/api/sendMessage' : 'https://functionappdatingiot.azurewebsites.net/api/sendMessage';
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ persist: true, user, otherUser, message, senderName, receiverName, timestamp, stringTimestamp, messageId }),
+  });
+  if (!response.ok) {
+    throw new Error(`Send Message Error: ${response.statusText}`);
+  }
+  return await response.json();
+};
+
+// Sends several SignalR messages (sendMessage bodies, optionally with a userId) in one call
+const broadcastMessages = async (messages) => {
+  url = local ? 'http://localhost:7071/api/BroadcastMessages' : 'https://functionappdatingiot.azurewebsites.net/api/broadcastmessages';
+  try {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ messages }),
+    });
+    if (!response.ok) {
+      throw new Error(`Broadcast Error: ${response.statusText}`);
+    }
+  } catch (error) {
+    console.error('Broadcast Error:', error);
+  }
+};
+
+// Joins (or leaves) the chat groups with several users at once; all: true means every conversation
+const joinSignalRGroups = async ({ user, otherUsers, all = false, leave = false }) => {
+  const name = leave ? 'LeaveSignalRGroup' : 'JoinSignalRGroup';
+  url = local ? `http://localhost:7071/api/${name}` : `https://functionappdatingiot.azurewebsites.net/api/${name.toLowerCase()}`;
+  try {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ user, otherUsers, all }),
+    });
+    if (!response.ok) {
+      throw new Error(`${name} Error: ${response.statusText}`);
+    }
+    return await response.json();
+  } catch (error) {
+    console.error(`${name} Error:`, error);
+  }
 };
 
 const sendMessage = async ({user = "", otherUser = "", message = "", timestamp, groupName}) => {
@@ -160,7 +324,7 @@ const sendMessage = async ({user = "", otherUser = "", message = "", timestamp,
 };
 
 
-const sendPdfViaEmail = async (pdfBase64, email) => {
+const sendPdfViaEmail = async (pdfBase64, email, { bar, seats, size } = {}) => {
   console.log('Sending PDF via email:', email);
   url = local ? 'http://localhost:7071/api/SendPDFByEmail' : 'https://functionappdatingiot.azurewebsites.net/api/sendpdfbyemail';
   try {
@@ -172,6 +336,9 @@ const sendPdfViaEmail = async (pdfBase64, email) => {
       body: JSON.stringify({
         pdf: pdfBase64,
         email: email,
+        bar: bar,
+        seats: seats,
+        size: size,
       }),
     });
 
@@ -189,4 +356,4 @@ const sendPdfViaEmail = async (pdfBase64, email) => {
 
 
 
-export { saveMessage, getMessages, insertIntoTable, readFromTable, deleteFromTable, uploadToBlob, sendPdfViaEmail, sendMessage };
+export { getChatHistory, insertIntoTable, readFromTable, deleteFromTable, batchTable, uploadToBlob, uploadDirect, sendPdfViaEmail, sendMessage, sendChatMessage, broadcastMessages, connectToSeat, joinBarGroup, joinSignalRGroups };
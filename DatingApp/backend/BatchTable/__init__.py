@@ -0,0 +1,44 @@
+import logging
+import azure.functions as func
+import json
+from shared_code import storage, table_cache, transactions
+
+MAX_OPERATIONS = 1000
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Batching table operations.')
+
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
+
+    table_name = req_body.get('table_name')
+    operations = req_body.get('operations')
+
+    if not table_name or not isinstance(operations, list) or not operations:
+        return func.HttpResponse("Missing table_name or operations", status_code=400)
+    if len(operations) > MAX_OPERATIONS:
+        return func.HttpResponse(f"At most {MAX_OPERATIONS} operations per request", status_code=400)
+
+    try:
+        batch = [
+            transactions.to_operation(op.get('action'), op.get('entity'), op.get('etag'))
+            for op in operations
+        ]
+    except (AttributeError, ValueError) as e:
+        return func.HttpResponse(f"Invalid operation: {e}", status_code=400)
+
+    try:
+        table_client = storage.get_table_client(table_name)
+        results = transactions.submit_by_partition(table_client, batch)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse(f"Error: {e}", status_code=500)
+    finally:
+        table_cache.invalidate(table_name, {operation[1]['PartitionKey'] for operation in batch})
+
+    succeeded = sum(1 for result in results if result['status'] == 200)
+    logging.info(f"Batch finished: {succeeded}/{len(results)} operations succeeded")
+    status_code = 200 if succeeded == len(results) else 207
+    return func.HttpResponse(json.dumps({"results": results}), status_code=status_code, mimetype="application/json")
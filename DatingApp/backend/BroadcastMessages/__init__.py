@@ -0,0 +1,26 @@
+import logging
+import azure.functions as func
+import json
+from shared_code import signalr
+
+def main(req: func.HttpRequest, signalRDatingChat: func.Out[str]) -> func.HttpResponse:
+    logging.info('Broadcasting messages via SignalR.')
+
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
+
+    # {"messages": [SendMessage bodies, each optionally with a userId]}, all
+    # sent in one binding flush
+    items = req_body.get('messages') if isinstance(req_body, dict) else req_body
+    if not isinstance(items, list) or not items:
+        return func.HttpResponse("Missing messages", status_code=400)
+
+    try:
+        sent = signalr.emit(signalRDatingChat, [signalr.from_request(item) for item in items])
+    except ValueError as e:
+        return func.HttpResponse(f"Invalid messages: {e}", status_code=400)
+
+    logging.info(f"broadcast {sent} messages")
+    return func.HttpResponse(json.dumps({"sent": sent}), status_code=200, mimetype="application/json")
@@ -0,0 +1,46 @@
+import logging
+import azure.functions as func
+import json
+from shared_code import chat, storage, table_cache
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Chat history request.')
+
+    params = dict(req.params)
+    if req.method == 'POST':
+        try:
+            params.update(req.get_json())
+        except ValueError:
+            return func.HttpResponse("Invalid JSON body", status_code=400)
+
+    user = params.get('user')
+    other_user = params.get('otherUser')
+
+    if not user or not other_user:
+        return func.HttpResponse("Missing user or otherUser", status_code=400)
+
+    try:
+        table_client = storage.get_table_client('BarTable')
+
+        # POST with a message appends it to the conversation
+        if params.get('message') is not None:
+            entity = chat.new_message(
+                user, other_user, params.get('message'),
+                params.get('senderName'), params.get('receiverName'), params.get('timestamp'),
+                params.get('stringTimestamp'))
+            table_client.create_entity(entity=entity)
+            table_cache.invalidate('BarTable', [entity['PartitionKey']])
+            return func.HttpResponse(json.dumps(entity), status_code=200, mimetype="application/json")
+
+        limit = int(params.get('limit', chat.DEFAULT_PAGE_SIZE))
+        if limit < 1 or limit > chat.MAX_PAGE_SIZE:
+            return func.HttpResponse(f"limit must be between 1 and {chat.MAX_PAGE_SIZE}", status_code=400)
+
+        items, cursor = chat.latest_messages(
+            table_client, chat.conversation_key(user, other_user), limit, params.get('before'))
+        return func.HttpResponse(json.dumps({"items": items, "before": cursor}), status_code=200, mimetype="application/json")
+    except ValueError as e:
+        return func.HttpResponse(f"Invalid request: {e}", status_code=400)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse("Error reading chat history", status_code=500)
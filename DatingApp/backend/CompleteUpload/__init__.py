@@ -0,0 +1,27 @@
+import logging
+import azure.functions as func
+import json
+from shared_code import uploads
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Completing direct upload.')
+
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
+
+    container_name = req_body.get('container_name', 'uploads')
+    blob_name = req_body.get('blob_name')
+
+    try:
+        uploads.validate(container_name, blob_name)
+        upload = uploads.complete(container_name, blob_name)
+    except ValueError as e:
+        return func.HttpResponse(f"Upload rejected: {e}", status_code=422)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse("Error completing upload", status_code=500)
+
+    logging.info(f"Upload completed: {upload['url']}")
+    return func.HttpResponse(json.dumps(upload), status_code=200, mimetype="application/json")
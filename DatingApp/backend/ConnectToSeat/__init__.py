@@ -1,8 +1,17 @@
 import logging
 import azure.functions as func
 import json
-import os
-from azure.data.tables import TableServiceClient, UpdateMode
+from shared_code import seats, signalr, storage, table_cache
+
+def seat_messages(target, arguments, bar, seat, user):
+    # connectSeat/disconnectSeat, plus the seat row on ReceiveMessage_seatsChange
+    # that ViewMapScreen listens to; only clients in the bar's group get them
+    seat_row = {"PartitionKey": bar, "RowKey": seat, "connectedUser": user}
+    group = seats.bar_group(bar)
+    return [
+        {"target": target, "arguments": arguments, "groupName": group},
+        {"target": "ReceiveMessage_seatsChange", "arguments": [user, "", seat_row, None], "groupName": group},
+    ]
 
 def main(req: func.HttpRequest, signalRDatingChat: func.Out[str]) -> func.HttpResponse:
     logging.info('seats via SignalR.')
@@ -15,48 +24,53 @@ def main(req: func.HttpRequest, signalRDatingChat: func.Out[str]) -> func.HttpRe
     user = req_body.get('user')
     seat = req_body.get('seat')
     action = req_body.get('action')
+    bar = req_body.get('bar')
 
-    if not user or not seat or not action:
-        return func.HttpResponse("Missing user, otherUser, message, or timestamp", status_code=400)
-
-    if action == 'add':
-        logging.info(f"adding user: {user} to seat: {seat}")
-        signalRMessage = {
-            "target": "connectSeat",
-            "arguments": [seat, user],
-        }
-    if action == "remove":
-        logging.info(f"removing user: {user} from seat: {seat}")
-        signalRMessage = {
-            "target": "disconnectSeat",
-            "arguments": [seat],
-        }
-    
-    signalRDatingChat.set(json.dumps(signalRMessage))
-    
-    try:
-        connection_string = os.getenv('AzureWebJobsStorage')
-        table_service_client = TableServiceClient.from_connection_string(conn_str=connection_string)
-        table_client = table_service_client.get_table_client(table_name='BarTable')
-        
-        partition_key = f"bar_1"
-        row_key = seat
-
-        entity = {
-            "PartitionKey": partition_key,
-            "RowKey": row_key,
-        }
-
-        if action == 'add':
-            entity["connectedUser"] = user
-        elif action == 'remove':
-            entity["connectedUser"] = ""
+    if not user or not seat or action not in ('add', 'remove'):
+        return func.HttpResponse("Missing user, seat, or action", status_code=400)
+    if not isinstance(seat, str) or (bar is not None and not isinstance(bar, str)):
+        return func.HttpResponse("seat and bar must be strings", status_code=400)
 
-        table_client.update_entity(mode=UpdateMode.MERGE, entity=entity)
+    # A scanned QR code ("bar1;seat_3") can be passed as the seat as-is
+    if ';' in seat:
+        bar, seat = seat.split(';', 1)
+    if not bar:
+        return func.HttpResponse("Missing bar", status_code=400)
 
+    # The whole claim happens here: the seat row is updated only if nobody
+    # changed it since it was read, then the user's connectedSeats, and only
+    # then is the change broadcast.
+    try:
+        table_client = storage.get_table_client('BarTable')
+        # Each bar's seats live in that bar's own partition
+        if not seats.bar_exists(table_client, bar):
+            return func.HttpResponse(f"Unknown bar {bar}", status_code=404)
+        signalRMessages = []
+        if action == 'add':
+            logging.info(f"adding user: {user} to seat: {seat}")
+            connected_seats, previous = seats.claim(table_client, bar, seat, user)
+            if previous:
+                signalRMessages += seat_messages("disconnectSeat", [previous], bar, previous, "")
+            signalRMessages += seat_messages("connectSeat", [seat, user], bar, seat, user)
+        else:
+            logging.info(f"removing user: {user} from seat: {seat}")
+            connected_seats, freed = seats.release(table_client, bar, seat, user)
+            if freed:
+                signalRMessages += seat_messages("disconnectSeat", [seat], bar, seat, "")
+        table_cache.invalidate('BarTable', [bar, 'Users'])
 
+    except seats.SeatTaken as e:
+        return func.HttpResponse(str(e), status_code=409)
+    except LookupError as e:
+        return func.HttpResponse(str(e), status_code=404)
     except Exception as e:
-        logging.error(f"Error inserting entity into table: {e}")
-        return func.HttpResponse("Error inserting entity into table", status_code=500)
+        logging.error(f"Error updating seat: {e}")
+        return func.HttpResponse("Error updating seat", status_code=500)
+
+    signalr.emit(signalRDatingChat, signalRMessages)
 
-    return func.HttpResponse("Message sent successfully", status_code=200)
+    return func.HttpResponse(
+        json.dumps({"bar": bar, "seat": seat, "connectedSeats": connected_seats}),
+        status_code=200,
+        mimetype="application/json"
+    )
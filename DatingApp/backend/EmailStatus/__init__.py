@@ -0,0 +1,21 @@
+import logging
+import azure.functions as func
+import json
+from shared_code import outbox
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Email status request.')
+
+    job_id = req.params.get('id')
+    if not job_id:
+        return func.HttpResponse("Please pass an id parameter in the query string", status_code=400)
+
+    try:
+        record = outbox.get_outbox().get(job_id)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse("Error reading email status", status_code=500)
+
+    if record is None:
+        return func.HttpResponse("Unknown email job", status_code=404)
+    return func.HttpResponse(json.dumps({"id": job_id, **record}), status_code=200, mimetype="application/json")
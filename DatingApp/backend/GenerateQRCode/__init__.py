@@ -1,12 +1,12 @@
 import logging
-import qrcode
-import io
 import azure.functions as func
+from shared_code import qr
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
 
-    data = req.params.get('data')
+    params = dict(req.params)
+    data = params.get('data')
     if not data:
         logging.info('no datat')
         try:
@@ -14,30 +14,33 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         except ValueError:
             pass
         else:
+            params.update(req_body)
             data = req_body.get('data')
 
     if data:
         logging.info('datat is ' + data)
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        logging.info('QR code created')
-        qr.add_data(data)
-        logging.info('data added')
-        qr.make(fit=True)
-        logging.info('QR code made')
-        img = qr.make_image(fill='black', back_color='white')
-        logging.info('QR code image')
-        buf = io.BytesIO()
-        logging.info('buffer created')
-        img.save(buf)
-        logging.info('QR code saved')
-        buf.seek(0)
+        fmt = params.get('format', 'png')
+        try:
+            scale = int(params.get('scale', 10))
+        except (TypeError, ValueError):
+            scale = 0
+        if fmt not in qr.MIMETYPES or scale < 1 or scale > qr.MAX_SCALE:
+            return func.HttpResponse(
+                f"format must be one of {', '.join(qr.MIMETYPES)} and scale between 1 and {qr.MAX_SCALE}",
+                status_code=400
+            )
+
+        etag = qr.etag(qr.cache_key(data, fmt, scale))
+        headers = {"ETag": etag, "Cache-Control": qr.CACHE_CONTROL}
+
+        # The image for a given key never changes, so a matching ETag needs no render at all
+        if_none_match = req.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return func.HttpResponse(status_code=304, headers=headers)
+
+        body = qr.render(data, fmt, scale)
         logging.info('QR code generated')
-        return func.HttpResponse(buf.read(), mimetype="image/png")
+        return func.HttpResponse(body, mimetype=qr.MIMETYPES[fmt], headers=headers)
     else:
         return func.HttpResponse(
             "Please pass a data parameter in the query string or in the request body",
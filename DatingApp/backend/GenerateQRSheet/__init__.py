@@ -0,0 +1,44 @@
+import logging
+import azure.functions as func
+from shared_code import qr, seats, storage
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Generating QR sheet.')
+
+    params = dict(req.params)
+    try:
+        params.update(req.get_json())
+    except ValueError:
+        pass
+
+    bar_id = params.get('bar')
+    output = params.get('format', 'pdf')
+
+    if not bar_id:
+        return func.HttpResponse("Please pass a bar parameter in the query string or in the request body", status_code=400)
+    if output not in ('pdf', 'zip'):
+        return func.HttpResponse("format must be pdf or zip", status_code=400)
+
+    try:
+        size_cm = float(params.get('size', 5))
+        seat_ids = seats.list_seat_ids(storage.get_table_client('BarTable'), bar_id)
+        if not seat_ids:
+            return func.HttpResponse(f"No seats found for {bar_id}", status_code=404)
+
+        pngs = qr.render_many([seats.qr_data(bar_id, seat_id) for seat_id in seat_ids])
+        logging.info(f"Rendered {len(pngs)} QR codes for {bar_id}")
+
+        if output == 'zip':
+            body = qr.compose_zip((f"{seat_id}.png", png) for seat_id, png in zip(seat_ids, pngs))
+            return func.HttpResponse(body, mimetype="application/zip",
+                                     headers={"Content-Disposition": f'attachment; filename="{bar_id}_QRCodes.zip"'})
+
+        labels = [seats.seat_label(seat_id) for seat_id in seat_ids]
+        body = qr.compose_pdf(zip(labels, pngs), size_cm)
+        return func.HttpResponse(body, mimetype="application/pdf",
+                                 headers={"Content-Disposition": f'attachment; filename="{bar_id}_QRCodes.pdf"'})
+    except ValueError as e:
+        return func.HttpResponse(f"Invalid request: {e}", status_code=400)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse("Error generating QR sheet", status_code=500)
@@ -0,0 +1,31 @@
+import logging
+import azure.functions as func
+import json
+from shared_code import uploads
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Issuing upload SAS.')
+
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
+
+    container_name = req_body.get('container_name', 'uploads')
+    blob_name = req_body.get('blob_name')
+    content_type = req_body.get('content_type', 'image/png')
+
+    try:
+        size = int(req_body.get('size'))
+        uploads.validate(container_name, blob_name, content_type, size)
+    except (TypeError, ValueError) as e:
+        return func.HttpResponse(f"Invalid upload request: {e}", status_code=400)
+
+    try:
+        upload = uploads.grant(container_name, blob_name, content_type, size)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse("Error issuing upload SAS", status_code=500)
+
+    logging.info(f"Upload SAS issued for {container_name}/{blob_name}")
+    return func.HttpResponse(json.dumps(upload), status_code=200, mimetype="application/json")
@@ -1,7 +1,9 @@
 import logging
 import azure.functions as func
-import os
-from azure.data.tables import TableServiceClient, TableEntity, UpdateMode
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError
+from azure.data.tables import TableEntity
+from shared_code import storage, table_cache, transactions
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
@@ -10,25 +12,35 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         req_body = req.get_json()
         action = req_body.get('action')
         table_name = req_body.get('table_name')
+        etag = req_body.get('etag')
         logging.info(f'Request body: {req_body}')
-        connection_string = os.getenv('AzureWebJobsStorage')
-        table_service_client = TableServiceClient.from_connection_string(conn_str=connection_string)
-        table_client = table_service_client.get_table_client(table_name=table_name)
+
+        if action not in transactions.ACTIONS or action == 'delete':
+            return func.HttpResponse(f"Unsupported action: {action}", status_code=400)
+        operation, mode = transactions.ACTIONS[action]
+
+        table_client = storage.get_table_client(table_name)
 
         entity = TableEntity(req_body['entity'])
         logging.info(f'Inserting entity: {entity}')
-        if action == 'create':
-            table_client.create_entity(entity=entity)
-        elif action == 'update':
-            existing_entity = table_client.get_entity(entity['PartitionKey'], entity['RowKey'])
-            for key, value in entity.items():
-                if key not in ['PartitionKey', 'RowKey']:
-                    existing_entity[key] = value
+        if operation == 'create':
+            metadata = table_client.create_entity(entity=entity)
+        elif operation == 'upsert':
+            metadata = table_client.upsert_entity(entity=entity, mode=mode)
+        elif etag:
+            # Conditional write: fails with 412 if someone else changed the row since it was read
+            metadata = table_client.update_entity(
+                entity=entity, mode=mode, etag=etag, match_condition=MatchConditions.IfNotModified)
+        else:
+            metadata = table_client.update_entity(entity=entity, mode=mode)
 
-        # Update the entity in the table
-            table_client.update_entity(entity=entity)
+        table_cache.invalidate(table_name, [entity['PartitionKey']])
 
-        return func.HttpResponse("Entity added successfully", status_code=200)
+        headers = {"ETag": metadata['etag']} if metadata and metadata.get('etag') else None
+        return func.HttpResponse("Entity added successfully", status_code=200, headers=headers)
+    except ResourceModifiedError:
+        table_cache.invalidate(table_name, [entity['PartitionKey']])
+        return func.HttpResponse("Entity was modified by another writer", status_code=412)
     except Exception as e:
         logging.error(f"Error: {e}")
         return func.HttpResponse(f"Error: {e}", status_code=500)
@@ -0,0 +1,7 @@
+import logging
+import azure.functions as func
+from shared_code import signalr
+
+def main(req: func.HttpRequest, signalRDatingChat: func.Out[str]) -> func.HttpResponse:
+    logging.info('joining bar group.')
+    return signalr.bar_group_request(req, signalRDatingChat, 'add')
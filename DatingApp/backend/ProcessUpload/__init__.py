@@ -0,0 +1,11 @@
+import logging
+import azure.functions as func
+from shared_code import uploads
+
+def main(msg: func.QueueMessage) -> None:
+    upload = msg.get_json()
+    logging.info(f"Processing upload {upload.get('container_name')}/{upload.get('blob_name')} (dequeue count {msg.dequeue_count})")
+
+    stored = uploads.process_direct_upload(
+        upload['container_name'], upload['blob_name'], upload.get('size'), upload.get('content_type'))
+    logging.info(f"Upload {'unchanged' if stored['deduplicated'] else 'indexed'}: {stored['url']}")
@@ -0,0 +1,9 @@
+import logging
+import azure.functions as func
+import json
+from shared_code import table_cache
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Reporting read cache statistics.')
+
+    return func.HttpResponse(json.dumps(table_cache.cache.stats()), status_code=200, mimetype="application/json")
@@ -1,23 +1,120 @@
 import logging
 import azure.functions as func
-import os
 import json
-from azure.data.tables import TableServiceClient
+import base64
+import binascii
+from shared_code import storage, table_cache
+
+MAX_PAGE_SIZE = 1000  # Table storage never returns more than 1000 entities per request
+
+def encode_continuation_token(token):
+    if not token:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(token).encode('utf-8')).decode('ascii')
+
+def decode_continuation_token(token):
+    if not token:
+        return None
+    if not isinstance(token, str):
+        raise ValueError("Invalid continuation_token")
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid continuation_token")
+    if not isinstance(decoded, dict):
+        raise ValueError("Invalid continuation_token")
+    return decoded
+
+def parse_select(select):
+    if select is None:
+        return None
+    if isinstance(select, str):
+        select = select.split(',')
+    if not isinstance(select, list) or not all(isinstance(name, str) for name in select):
+        raise ValueError("select must be a list of property names")
+    select = [name.strip() for name in select if name.strip()]
+    return select or None
+
+def project(entities, select):
+    # The service already projects, but it may still hand back system properties,
+    # so trim the output to exactly what was asked for.
+    if not select:
+        return list(entities)
+    return [{name: entity[name] for name in select if name in entity} for entity in entities]
+
+def read_page(table_client, query_filter, select, page_size, continuation_token):
+    # Storage may hand back short (or empty) pages before the filter is exhausted,
+    # so keep following the token until the page is full or there is nothing left.
+    items = []
+    while True:
+        pages = table_client.query_entities(
+            query_filter=query_filter,
+            select=select,
+            results_per_page=page_size - len(items),
+        ).by_page(continuation_token=continuation_token)
+        items.extend(project(next(pages, []), select))
+        continuation_token = pages.continuation_token
+        if len(items) >= page_size or not continuation_token:
+            return items, continuation_token
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
 
     try:
         req_body = req.get_json()
-        connection_string = os.getenv('AzureWebJobsStorage')
-        table_service_client = TableServiceClient.from_connection_string(conn_str = connection_string)
-        table_client = table_service_client.get_table_client(table_name=req_body['table_name'])
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
+
+    # results_per_page is accepted as an alias of page_size to match the SDK naming
+    page_size = req_body.get('page_size', req_body.get('results_per_page'))
+    continuation_token = req_body.get('continuation_token')
+    paged = page_size is not None or continuation_token is not None
+
+    if paged:
+        try:
+            page_size = int(page_size or MAX_PAGE_SIZE)
+            continuation_token = decode_continuation_token(continuation_token)
+        except (TypeError, ValueError) as e:
+            return func.HttpResponse(f"Invalid paging parameters: {e}", status_code=400)
+        if page_size < 1 or page_size > MAX_PAGE_SIZE:
+            return func.HttpResponse(f"page_size must be between 1 and {MAX_PAGE_SIZE}", status_code=400)
+
+    try:
+        select = parse_select(req_body.get('select'))
+    except ValueError as e:
+        return func.HttpResponse(str(e), status_code=400)
+
+    table_name = req_body.get('table_name')
+    query_filter = req_body.get('query_filter', '')
+    use_cache = table_cache.is_cacheable(table_name, query_filter, req_body.get('cache'))
+    mimetype = "application/json" if paged else "text/plain"
+    cache_key = table_cache.make_key(
+        table_name, query_filter, select, page_size, json.dumps(continuation_token, sort_keys=True))
+
+    if use_cache:
+        cached = table_cache.cache.get(cache_key)
+        if cached is not None:
+            return func.HttpResponse(cached, status_code=200, mimetype=mimetype, headers={"X-Cache": "HIT"})
+        # Taken before the query, so a write that lands while it runs keeps
+        # these (possibly stale) rows out of the cache
+        generation = table_cache.cache.generation(cache_key)
+
+    try:
+        table_client = storage.get_table_client(table_name)
 
-        query_filter = req_body.get('query_filter', '')
-        entities = table_client.query_entities(query_filter=query_filter)
+        if not paged:
+            entities = table_client.query_entities(query_filter=query_filter, select=select)
+            body = json.dumps(project(entities, select))
+        else:
+            entities_list, next_token = read_page(table_client, query_filter, select, page_size, continuation_token)
+            body = json.dumps({
+                "items": entities_list,
+                "continuation_token": encode_continuation_token(next_token),
+            })
 
-        entities_list = [entity for entity in entities]
-        return func.HttpResponse(json.dumps(entities_list), status_code=200)
+        if use_cache:
+            table_cache.cache.put(cache_key, body, generation)
+        return func.HttpResponse(body, status_code=200, mimetype=mimetype, headers={"X-Cache": "MISS"})
     except Exception as e:
         logging.error(f"Error: {e}")
         return func.HttpResponse("Error reading entities", status_code=500)
@@ -0,0 +1,9 @@
+import logging
+import azure.functions as func
+from shared_code import mailer, outbox
+
+def main(msg: func.QueueMessage) -> None:
+    job = msg.get_json()
+    logging.info(f"Processing email job {job.get('id')} (dequeue count {msg.dequeue_count})")
+
+    outbox.process(outbox.get_outbox(), job, mailer.send_qr_job)
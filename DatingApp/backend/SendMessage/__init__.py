@@ -1,8 +1,7 @@
 import logging
 import azure.functions as func
 import json
-import os
-from azure.data.tables import TableServiceClient
+from shared_code import chat, signalr, storage, table_cache
 
 def main(req: func.HttpRequest, signalRDatingChat: func.Out[str]) -> func.HttpResponse:
     logging.info('Sending message via SignalR.')
@@ -18,17 +17,40 @@ def main(req: func.HttpRequest, signalRDatingChat: func.Out[str]) -> func.HttpRe
     timestamp = req_body.get('timestamp')
     groupName = req_body.get('groupName')
 
+    # persist: store the chat message and both summary rows, then broadcast
+    # them, all from this one call
+    if req_body.get('persist'):
+        if not user or not other_user or not isinstance(message, str) or not message:
+            return func.HttpResponse("Missing user, otherUser, or message", status_code=400)
+        try:
+            entity, _, other_summary = chat.send_message(
+                storage.get_table_client('BarTable'), user, other_user, message,
+                req_body.get('senderName'), req_body.get('receiverName'), timestamp, req_body.get('stringTimestamp'),
+                req_body.get('messageId'))
+        except ValueError as e:
+            return func.HttpResponse(f"Invalid request: {e}", status_code=400)
+        except Exception as e:
+            logging.error(f"Error storing message: {e}")
+            return func.HttpResponse("Error storing message", status_code=500)
+        finally:
+            table_cache.invalidate('BarTable', [
+                chat.conversation_key(user, other_user), chat.chat_partition(user), chat.chat_partition(other_user)])
+
+        logging.info(f"stored message {entity['RowKey']} in {entity['PartitionKey']}")
+        # Straight to the two users' connections, so neither has to be in the
+        # conversation's group; the sender gets its own message back as before
+        sent_at = entity['Timestamp']
+        signalr.emit(signalRDatingChat, [
+            signalr.user_message(other_user, entity['PartitionKey'], user, other_user, entity, sent_at),
+            signalr.user_message(user, entity['PartitionKey'], user, other_user, entity, sent_at),
+            signalr.user_message(other_user, chat.chat_partition(other_user), user, other_user, other_summary, sent_at),
+        ])
+        return func.HttpResponse(json.dumps(entity), status_code=200, mimetype="application/json")
+
     if not groupName:
         return func.HttpResponse("Missing user, otherUser, message, or timestamp", status_code=400)
 
     logging.info(f"sending message toGroup name: {groupName}")
-    signalRMessage = {
-        "target": "ReceiveMessage_" + groupName,
-        "arguments": [user, other_user ,message, timestamp],
-    }
-    
-    signalRDatingChat.set(json.dumps(signalRMessage))
-    
-
+    signalr.emit(signalRDatingChat, [signalr.receive_message(groupName, user, other_user, message, timestamp)])
 
     return func.HttpResponse("Message sent successfully", status_code=200)
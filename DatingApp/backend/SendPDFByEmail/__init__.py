@@ -1,47 +1,58 @@
 import logging
-import base64
-import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Attachment, Disposition, FileContent, FileName, FileType
+import hashlib
+import json
 import azure.functions as func
+from shared_code import mailer, outbox, qr, seats, storage
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
 
-    sendgrid_api_key = os.getenv('SENDGRID_API_KEY')
-    email_from = os.getenv('SenderEmailAddress')
-
-    req_body = req.get_json()
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
     pdf_base64 = req_body.get('pdf')
+    bar_id = req_body.get('bar')
     email_to = req_body.get('email')
 
-    if not all([sendgrid_api_key, email_from, pdf_base64, email_to]):
+    if not all([mailer.is_configured(), pdf_base64 or bar_id, email_to]):
         return func.HttpResponse("Missing required fields", status_code=400)
 
-    message = Mail(
-        from_email=email_from,
-        to_emails=email_to,
-        subject='QR Code PDF',
-        html_content='<strong>Please find the attached PDF with the QR codes.</strong>'
-    )
-
-    decoded_pdf = base64.b64decode(pdf_base64)
-    attachment = Attachment(
-        FileContent(pdf_base64),
-        FileName('QRCode.pdf'),
-        FileType('application/pdf'),
-        Disposition('attachment')
-    )
-
-    message.attachment = attachment
+    # The PDF is composed (for a bar) and sent by SendEmailWorker; this request
+    # only records the job, so the caller never waits on SendGrid.
+    job = {"email": email_to}
+    if bar_id:
+        # Checked here, so a job the worker could never compose is not queued
+        pdf_base64 = None
+        seat_ids = req_body.get('seats')
+        if seat_ids is not None and not (
+                isinstance(seat_ids, list) and seat_ids
+                and all(isinstance(seat, (str, int)) and not isinstance(seat, bool) for seat in seat_ids)):
+            return func.HttpResponse("seats must be a non-empty list of seat ids", status_code=400)
+        try:
+            size_cm = qr.check_size(float(req_body.get('size', 5)))
+        except (TypeError, ValueError) as e:
+            return func.HttpResponse(f"Invalid size: {e}", status_code=400)
+        try:
+            if not seats.bar_exists(storage.get_table_client('BarTable'), str(bar_id)):
+                return func.HttpResponse(f"Unknown bar: {bar_id}", status_code=400)
+        except Exception as e:
+            logging.error(f"Error looking up bar {bar_id}: {e}")
+            return func.HttpResponse("Error looking up bar", status_code=500)
+        job.update(bar=bar_id, seats=seat_ids, size=size_cm)
+    if req_body.get('dedup_key'):
+        job["id"] = hashlib.sha256(str(req_body['dedup_key']).encode('utf-8')).hexdigest()
 
     try:
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
-        logging.info(response.status_code)
-        logging.info(response.body)
-        logging.info(response.headers)
-        return func.HttpResponse("Email sent successfully", status_code=200)
+        job_id, record, created = outbox.enqueue(outbox.get_outbox(), job, pdf_base64)
     except Exception as e:
-        logging.error(f"Error sending email: {e}")
-        return func.HttpResponse(f"Error sending email: {str(e)}", status_code=500)
+        logging.error(f"Error queueing email: {e}")
+        return func.HttpResponse(f"Error queueing email: {str(e)}", status_code=500)
+
+    logging.info(f"Email job {job_id} {'queued' if created else 'already ' + record['status']}")
+    return func.HttpResponse(
+        json.dumps({"id": job_id, "status": record["status"]}),
+        status_code=202,
+        mimetype="application/json",
+        headers={"Location": f"/api/EmailStatus?id={job_id}"}
+    )
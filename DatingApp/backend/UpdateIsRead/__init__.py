@@ -1,7 +1,11 @@
 import logging
 import azure.functions as func
-import os
-from azure.data.tables import TableServiceClient
+from azure.data.tables import UpdateMode
+from shared_code import storage, table_cache, transactions
+
+# Table storage allows at most 15 comparisons per filter; past that we read the
+# (small, projected) partition and pick the rows out ourselves.
+MAX_FILTER_ROW_KEYS = 14
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Marking messages as read')
@@ -10,44 +14,51 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         req_body = req.get_json()
         user_email = req_body.get('user')  # The current user's email
         other_user_email = req_body.get('otherUser')  # The other participant's email
+        other_user_emails = req_body.get('otherUsers') or []  # Or several conversations at once
 
-        if not user_email or not other_user_email:
-            return func.HttpResponse("Invalid request: missing user or other user email", status_code=400)
+        if not isinstance(other_user_emails, list):
+            return func.HttpResponse("Invalid request: otherUsers must be a list", status_code=400)
+        other_user_emails = set(other_user_emails)
+        if other_user_email:
+            other_user_emails.add(other_user_email)
 
-        connection_string = os.getenv('AzureWebJobsStorage')
-        table_service_client = TableServiceClient.from_connection_string(conn_str=connection_string)
-        table_client = table_service_client.get_table_client(table_name="BarTable")
+        if not user_email or not other_user_emails:
+            return func.HttpResponse("Invalid request: missing user or other user email", status_code=400)
 
-        # Construct the PartitionKey based on the two emails
-        # users = sorted([user_email, other_user_email])
-        # partition_key = f"{users[0]};{users[1]}"
-        
+        table_client = storage.get_table_client("BarTable")
 
-        # Query to get all unread messages where the user is not the sender
-        # query_filter = f"PartitionKey eq '{partition_key}' and Sender eq '{other_user_email}' and isRead eq false"
-        query_filter = f"PartitionKey eq '{user_email}' and RowKey eq '{other_user_email}'"
+        parameters = {"user": user_email}
+        query_filter = "PartitionKey eq @user"
+        if len(other_user_emails) <= MAX_FILTER_ROW_KEYS:
+            row_keys = []
+            for i, other_user_email in enumerate(sorted(other_user_emails)):
+                parameters[f"rk{i}"] = other_user_email
+                row_keys.append(f"RowKey eq @rk{i}")
+            query_filter += f" and ({' or '.join(row_keys)})"
         logging.info(f"Running query: {query_filter}")
-        
-        entities = table_client.query_entities(query_filter=query_filter)
 
-        # Log the number of entities found
-        entities_list = list(entities)  # Convert to a list to count
-        logging.info(f"Number of unread messages found: {len(entities_list)}")
+        entities = table_client.query_entities(
+            query_filter=query_filter, parameters=parameters, select=["PartitionKey", "RowKey", "isRead"])
+
+        # Only touch conversations that are actually unread, and only their isRead flag
+        operations = [
+            ("update", {"PartitionKey": entity["PartitionKey"], "RowKey": entity["RowKey"], "isRead": True},
+             {"mode": UpdateMode.MERGE})
+            for entity in entities
+            if entity["RowKey"] in other_user_emails and entity.get("isRead") is not True
+        ]
+        logging.info(f"Number of unread conversations found: {len(operations)}")
 
-        if not entities_list:
-            logging.info(f"No unread messages for {other_user_email} found.")
+        if not operations:
             return func.HttpResponse("No unread messages found", status_code=200)
 
-        # Update all unread messages
-        updated_count = 0
-        for entity in entities_list:
-            logging.info(f"Marking message as read: {entity}")
-            entity["isRead"] = True
-            # table_client.update_entity(entity, mode="Merge")
-            table_client.update_entity(entity=entity)
-            updated_count += 1
+        results = transactions.submit_by_partition(table_client, operations)
+        table_cache.invalidate("BarTable", [user_email])
 
+        updated_count = sum(1 for result in results if result["status"] == 200)
         logging.info(f"Total messages marked as read: {updated_count}")
+        if updated_count != len(results):
+            return func.HttpResponse(f"Error updating entities: {len(results) - updated_count} failed", status_code=500)
 
         return func.HttpResponse(f"Messages marked as read: {updated_count}", status_code=200)
 
@@ -1,36 +1,66 @@
 import logging
 import azure.functions as func
 import os
-from azure.storage.blob import BlobServiceClient
-import uuid
-from io import BytesIO
+from shared_code import uploads
 import base64
+import json
+
+def read_upload(req):
+    # Three ways in, picked by Content-Type:
+    #  - application/json: the original {image_data (base64), container_name, blob_name} body
+    #  - multipart/form-data: a "file" part, names in form fields or the query string
+    #  - anything else: the raw body is the image, names in the query string
+    # Returns (container_name, blob_name, data, length, content_type); data is bytes or a stream.
+    content_type = req.headers.get('Content-Type', '').split(';')[0].strip().lower()
+
+    if content_type == 'application/json':
+        req_body = req.get_json()
+        image_data = req_body.get('image_data')
+        data = base64.b64decode(image_data) if image_data else None
+        return (req_body.get('container_name', 'uploads'), req_body.get('blob_name'),
+                data, len(data) if data else 0, req_body.get('content_type'))
+
+    if content_type == 'multipart/form-data':
+        upload = req.files.get('file')
+        fields = {**req.params, **req.form}
+        if upload is None:
+            return fields.get('container_name', 'uploads'), fields.get('blob_name'), None, 0, None
+        upload.stream.seek(0, os.SEEK_END)
+        length = upload.stream.tell()
+        upload.stream.seek(0)
+        return (fields.get('container_name', 'uploads'), fields.get('blob_name') or upload.filename,
+                upload.stream, length, upload.mimetype or None)
+
+    # The host hands us the body already read; upload it as-is, without copying it again
+    data = req.get_body()
+    return (req.params.get('container_name', 'uploads'), req.params.get('blob_name'),
+            data, len(data), content_type or None)
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
 
     try:
-        req_body = req.get_json()
-        image_data = req_body.get('image_data')
-        container_name = req_body.get('container_name', 'uploads')
-        blob_name = req_body.get('blob_name')
+        container_name, blob_name, data, length, content_type = read_upload(req)
 
-        if not image_data or not blob_name:
+        if not data or not blob_name:
             logging.error('Missing required parameters')
             return func.HttpResponse("Missing required parameters", status_code=400)
+        if length > uploads.MAX_UPLOAD_BYTES:
+            return func.HttpResponse(f"Upload larger than {uploads.MAX_UPLOAD_BYTES} bytes", status_code=413)
 
-        blob_service_client = BlobServiceClient.from_connection_string(os.getenv('AzureWebJobsStorage'))
-        container_client = blob_service_client.get_container_client(container_name)
-
-        blob_client = container_client.get_blob_client(blob_name)
+        # Stored under its content hash (objects/<md5>.<ext>), whose URL is
+        # returned; re-saving unchanged bytes skips the upload (see shared_code/uploads.py)
+        stored = uploads.store(container_name, blob_name, data, length, content_type)
+        logging.info(f"Image {'unchanged' if stored['deduplicated'] else 'uploaded successfully'}: {stored['url']}")
 
-        image_bytes = base64.b64decode(image_data)
-        blob_client.upload_blob(BytesIO(image_bytes), overwrite=True)  # Ensure the blob is overwritten if it exists
-
-        blob_url = blob_client.url
-        logging.info(f'Image uploaded successfully: {blob_url}')
-        return func.HttpResponse(blob_url, status_code=200)
+        # Older clients read the body as the plain URL; ask for JSON to get the other URLs too
+        if 'application/json' in req.headers.get('Accept', ''):
+            return func.HttpResponse(json.dumps(stored), status_code=200, mimetype="application/json")
+        return func.HttpResponse(stored['url'], status_code=200)
 
+    except ValueError as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse(f"Invalid upload: {e}", status_code=400)
     except Exception as e:
         logging.error(f"Error: {e}")
         return func.HttpResponse(f"Error: {e}", status_code=500)
@@ -1,12 +1,27 @@
 import azure.functions as func
 import json
 import logging
+from shared_code import identity, signalr
 
-def main(req: func.HttpRequest, connectionInfo) -> func.HttpResponse:
+def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request - negotiate')
-    connectionInfo = json.loads(connectionInfo)
-    connection_info_dict = {
-        "url": connectionInfo["url"],
-        "accessToken": connectionInfo["accessToken"]
-    }
-    return func.HttpResponse(json.dumps(connection_info_dict))
\ No newline at end of file
+    # Tokens are bound to the caller's verified identity, never to a user id
+    # the client merely claims; SendMessage delivers private messages by it
+    try:
+        user_id = identity.request_user(req)
+    except Exception as e:
+        logging.error(f"Error verifying caller: {e}")
+        return func.HttpResponse("Error verifying caller", status_code=502)
+    if not user_id:
+        return func.HttpResponse("Sign in required", status_code=401)
+    try:
+        connection_info_dict, max_age = signalr.connection_info_cache.get(user_id)
+    except Exception as e:
+        logging.error(f"Error issuing SignalR token: {e}")
+        return func.HttpResponse("Error issuing SignalR token", status_code=500)
+    # Clients may reuse the answer for as long as this worker would
+    return func.HttpResponse(
+        json.dumps(connection_info_dict),
+        mimetype="application/json",
+        headers={"Cache-Control": f"private, max-age={max_age}", "Vary": "Authorization"}
+    )
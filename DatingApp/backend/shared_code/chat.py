@@ -0,0 +1,144 @@
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from azure.data.tables import UpdateMode
+
+# Chat messages live in "a;b" partitions (sorted emails). Their RowKey is
+# "m_" + (MAX_TIMESTAMP_MS - sent time in ms), zero padded, so Table storage's
+# ascending RowKey order is newest-first and "the latest N before X" is a
+# single range query. A suffix keeps messages sent in the same millisecond
+# apart: the client's own message id if it sent one (so a retried send writes
+# the same row again), else a random one. Legacy rows keyed by the raw timestamp sort outside the
+# "m_" range; tools/migrate_chat_rowkeys.py rewrites them.
+MESSAGE_PREFIX = 'm_'
+MESSAGE_RANGE_END = 'm`'  # '`' is the character right after '_'
+MAX_TIMESTAMP_MS = 10 ** 13 - 1
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+MESSAGE_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def conversation_key(user, other_user):
+    users = sorted([user, other_user])
+    return f"{users[0]};{users[1]}"
+
+
+def is_conversation_key(partition_key):
+    users = partition_key.split(';')
+    return len(users) == 2 and all('@' in user for user in users)
+
+
+def message_row_key(timestamp_ms=None, unique=None):
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+    if unique is None:
+        unique = uuid.uuid4().hex[:8]
+    return f"{MESSAGE_PREFIX}{MAX_TIMESTAMP_MS - int(timestamp_ms):013d}_{unique}"
+
+
+def timestamp_from_row_key(row_key):
+    return MAX_TIMESTAMP_MS - int(row_key[len(MESSAGE_PREFIX):].split('_', 1)[0])
+
+
+def parse_timestamp_ms(value):
+    # Accepts what the app has historically used for message times:
+    # Date.now() digits or new Date().toISOString() strings.
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp() * 1000)
+
+
+def new_message(user, other_user, message, sender_name=None, receiver_name=None, timestamp=None, string_timestamp=None,
+                message_id=None):
+    # string_timestamp is the sender's local "yyyy-MM-dd HH:mm:ss", which chat
+    # lists show as is; without it the UTC time is used. A message_id only
+    # names the same row twice together with the same timestamp.
+    if message_id is not None and (not timestamp or not isinstance(message_id, str)
+                                   or not MESSAGE_ID_PATTERN.fullmatch(message_id)):
+        raise ValueError("messageId must be 1-64 letters, digits, '-' or '_', sent with a timestamp")
+    timestamp_ms = parse_timestamp_ms(timestamp) if timestamp else int(time.time() * 1000)
+    sent = datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc)
+    return {
+        "PartitionKey": conversation_key(user, other_user),
+        "RowKey": message_row_key(timestamp_ms, message_id),
+        "Sender": user,
+        "SenderName": sender_name,
+        "reciverName": receiver_name,
+        "Message": message,
+        "Timestamp": sent.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        "StringTimestamp": string_timestamp or sent.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def latest_messages(table_client, partition_key, limit=DEFAULT_PAGE_SIZE, before=None):
+    # Newest-first page of a conversation. `before` is the RowKey of the oldest
+    # message the caller already has; the returned cursor feeds the next call.
+    query_filter = "PartitionKey eq @pk and RowKey gt @start and RowKey lt @end"
+    parameters = {"pk": partition_key, "start": before or MESSAGE_PREFIX, "end": MESSAGE_RANGE_END}
+    entities = table_client.query_entities(
+        query_filter=query_filter, parameters=parameters, results_per_page=limit)
+    items = [dict(entity) for entity in islice(entities, limit)]
+    # Table storage keeps Timestamp as its own system property and the SDK
+    # drops it from results, so hand back the send time from the RowKey
+    for item in items:
+        sent = datetime.fromtimestamp(timestamp_from_row_key(item["RowKey"]) / 1000, timezone.utc)
+        item["Timestamp"] = sent.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    cursor = items[-1]["RowKey"] if len(items) == limit else None
+    return items, cursor
+
+
+# Each user also has a "{email};chat" partition with one summary row per
+# conversation (RowKey is the other user), which ChatHistoryScreen lists.
+def chat_partition(user):
+    return f"{user};chat"
+
+
+def summary_row(user, other_user, other_user_name, message, is_read):
+    return {
+        "PartitionKey": chat_partition(user),
+        "RowKey": other_user,
+        "otherUserName": other_user_name,
+        "Message": message["Message"],
+        "isRead": is_read,
+        "Timestamp": message["Timestamp"],
+        "StringTimestamp": message["StringTimestamp"],
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=2)
+        return _pool
+
+
+def send_message(table_client, user, other_user, text, sender_name=None, receiver_name=None, timestamp=None,
+                 string_timestamp=None, message_id=None):
+    # Stores a message and both users' summary rows. The message row is written
+    # first, so a summary never points at a message that was not stored; the
+    # summaries are in two other partitions and go out concurrently. With a
+    # message_id every write is an upsert, so retrying after a failed summary
+    # write does not store the message twice.
+    # Returns (message, sender summary, receiver summary).
+    message = new_message(user, other_user, text, sender_name, receiver_name, timestamp, string_timestamp, message_id)
+    if message_id is None:
+        table_client.create_entity(entity=message)
+    else:
+        table_client.upsert_entity(entity=message, mode=UpdateMode.REPLACE)
+    summaries = (
+        summary_row(user, other_user, receiver_name, message, True),
+        summary_row(other_user, user, sender_name, message, False),
+    )
+    writes = [_get_pool().submit(table_client.upsert_entity, entity=summary, mode=UpdateMode.MERGE) for summary in summaries]
+    for write in writes:
+        write.result()
+    return (message,) + summaries
@@ -0,0 +1,108 @@
+import json
+import logging
+import azure.functions as func
+from shared_code import chat, signalr, storage, table_cache, transactions
+
+# SignalR keeps a user's group memberships across their connections, so they
+# are also recorded in BarTable, one row per group in the user's
+# "{email};groups" partition. Joining a group the user is already in, or
+# leaving one they are not in, then costs no SignalR action.
+MAX_PEERS = 500
+
+
+def membership_partition(user):
+    return f"{user};groups"
+
+
+def conversation_groups(table_client, user, req_body):
+    # Group names for the peers a join/leave request names: otherUser,
+    # an otherUsers list, or all: true for every conversation in the user's
+    # "{email};chat" partition. Raises ValueError.
+    if req_body.get('all'):
+        peers = [entity['RowKey'] for entity in table_client.query_entities(
+            query_filter="PartitionKey eq @pk", parameters={"pk": chat.chat_partition(user)}, select=["RowKey"])]
+    else:
+        peers = req_body.get('otherUsers')
+        if peers is None:
+            peers = [req_body.get('otherUser')]
+        if not isinstance(peers, list) or not all(isinstance(peer, str) and peer for peer in peers):
+            raise ValueError("otherUsers must be a list of emails")
+    if len(peers) > MAX_PEERS:
+        raise ValueError(f"At most {MAX_PEERS} peers per request")
+    return list(dict.fromkeys(chat.conversation_key(user, peer) for peer in peers))
+
+
+def current_groups(table_client, user):
+    entities = table_client.query_entities(
+        query_filter="PartitionKey eq @pk", parameters={"pk": membership_partition(user)}, select=["RowKey"])
+    return {entity['RowKey'] for entity in entities}
+
+
+def _apply(table_client, user, action, group_names):
+    operations = [
+        transactions.to_operation(action, {"PartitionKey": membership_partition(user), "RowKey": group_name})
+        for group_name in group_names
+    ]
+    try:
+        results = transactions.submit_by_partition(table_client, operations)
+    finally:
+        table_cache.invalidate('BarTable', [membership_partition(user)])
+    failed = [result for result in results if result['status'] != 200]
+    if failed:
+        raise RuntimeError(f"Could not record {len(failed)} group memberships: {failed[0]['error']}")
+
+
+def record_joined(table_client, user, group_names):
+    if group_names:
+        _apply(table_client, user, 'upsert', group_names)
+
+
+def record_left(table_client, user, group_names):
+    if group_names:
+        _apply(table_client, user, 'delete', group_names)
+
+
+def conversation_groups_request(req, out, action):
+    # JoinSignalRGroup (action "add") and LeaveSignalRGroup ("remove"). Groups
+    # the user is already in (or out of) are skipped unless force is set.
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
+
+    user = req_body.get('user')
+
+    if not user or not (req_body.get('otherUser') or req_body.get('otherUsers') is not None or req_body.get('all')):
+        return func.HttpResponse("Missing user, and otherUser, otherUsers or all", status_code=400)
+
+    joining = action == 'add'
+    try:
+        table_client = storage.get_table_client('BarTable')
+        requested = conversation_groups(table_client, user, req_body)
+        current = current_groups(table_client, user)
+        if req_body.get('force'):
+            changed = requested
+        else:
+            changed = [name for name in requested if (name in current) != joining]
+
+        logging.info(f"{'adding' if joining else 'removing'} {user} {'to' if joining else 'from'} "
+                     f"{len(changed)} groups, {len(requested) - len(changed)} unchanged")
+        signalr.emit(out, [
+            {'userId': user, 'groupName': name, 'action': action} for name in changed
+        ])
+        if joining:
+            record_joined(table_client, user, changed)
+        else:
+            record_left(table_client, user, [name for name in changed if name in current])
+    except ValueError as e:
+        return func.HttpResponse(f"Invalid request: {e}", status_code=400)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse("Error updating groups", status_code=500)
+
+    return func.HttpResponse(
+        json.dumps({"joined" if joining else "left": changed,
+                    "unchanged": [name for name in requested if name not in changed]}),
+        status_code=200,
+        mimetype="application/json"
+    )
@@ -0,0 +1,58 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import requests
+
+# Who is calling. With App Service authentication in front of the app, the
+# platform sets x-ms-client-principal-name itself. Otherwise the client sends
+# the Google access token it signed in with (Authorization: Bearer ...), which
+# is checked against Google's tokeninfo endpoint; a set GOOGLE_CLIENT_ID must
+# also match the client the token was issued to. Verified tokens are kept until
+# they expire (at most VERIFIED_TTL_SECONDS) so reconnects do not call Google.
+TOKENINFO_URL = 'https://oauth2.googleapis.com/tokeninfo'
+GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
+VERIFIED_TTL_SECONDS = int(os.getenv('IDENTITY_VERIFIED_TTL_SECONDS', '600'))
+VERIFIED_MAX_TOKENS = int(os.getenv('IDENTITY_VERIFIED_MAX_TOKENS', '4096'))
+
+_verified = OrderedDict()  # sha256(token) -> (valid until, email)
+_verified_lock = threading.Lock()
+
+
+def _verify_google_token(token):
+    # Returns the token's verified email, or None
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    now = time.time()
+    with _verified_lock:
+        entry = _verified.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+    response = requests.get(TOKENINFO_URL, params={'access_token': token}, timeout=10)
+    if response.status_code != 200:
+        return None
+    info = response.json()
+    if not info.get('email') or str(info.get('email_verified')).lower() != 'true':
+        return None
+    if GOOGLE_CLIENT_ID and GOOGLE_CLIENT_ID not in (info.get('aud'), info.get('azp')):
+        return None
+
+    valid_until = now + min(int(info.get('expires_in', 0)), VERIFIED_TTL_SECONDS)
+    with _verified_lock:
+        _verified[key] = (valid_until, info['email'])
+        _verified.move_to_end(key)
+        while len(_verified) > VERIFIED_MAX_TOKENS:
+            _verified.popitem(last=False)
+    return info['email']
+
+
+def request_user(req):
+    # Returns the caller's user id (email), or None if the request proves none
+    principal = req.headers.get('x-ms-client-principal-name')
+    if principal:
+        return principal
+    scheme, _, token = req.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        return _verify_google_token(token.strip())
+    return None
@@ -0,0 +1,54 @@
+import base64
+import os
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail, Attachment, Disposition, FileContent, FileName, FileType
+from shared_code import qr, seats, storage
+
+
+def is_configured():
+    return bool(os.getenv('SENDGRID_API_KEY') and os.getenv('SenderEmailAddress'))
+
+
+def compose_seat_pdf(bar_id, seat_ids=None, size_cm=5.0):
+    # Builds the QR sheet on the server from cached renders; without an explicit
+    # seat list every seat of the bar is included.
+    if seat_ids is None:
+        seat_ids = seats.list_seat_ids(storage.get_table_client('BarTable'), bar_id)
+    else:
+        seat_ids = [seat if str(seat).startswith(seats.SEAT_PREFIX) else f"{seats.SEAT_PREFIX}{seat}" for seat in seat_ids]
+    if not seat_ids:
+        raise ValueError(f"No seats found for {bar_id}")
+    pngs = qr.render_many([seats.qr_data(bar_id, seat_id) for seat_id in seat_ids])
+    return qr.compose_pdf(zip([seats.seat_label(seat_id) for seat_id in seat_ids], pngs), size_cm)
+
+
+def send_pdf(email_to, pdf_base64):
+    message = Mail(
+        from_email=os.getenv('SenderEmailAddress'),
+        to_emails=email_to,
+        subject='QR Code PDF',
+        html_content='<strong>Please find the attached PDF with the QR codes.</strong>'
+    )
+
+    attachment = Attachment(
+        FileContent(pdf_base64),
+        FileName('QRCode.pdf'),
+        FileType('application/pdf'),
+        Disposition('attachment')
+    )
+
+    message.attachment = attachment
+
+    sg = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
+    return sg.send(message)
+
+
+def send_qr_job(job, load_pdf_base64):
+    # A job either names a bar (the PDF is composed here) or points at a PDF the
+    # client uploaded, which load_pdf_base64(job) returns still base64-encoded.
+    if job.get('bar'):
+        pdf = compose_seat_pdf(job['bar'], job.get('seats'), float(job.get('size', 5)))
+        pdf_base64 = base64.b64encode(pdf).decode('ascii')
+    else:
+        pdf_base64 = load_pdf_base64(job)
+    return send_pdf(job['email'], pdf_base64)
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from shared_code import storage
+
+# Outbox for QR PDF emails. SendPDFByEmail records a job and enqueues it;
+# SendEmailWorker (queue trigger) sends it, retrying with exponential backoff
+# by re-enqueueing the job with a visibility delay; EmailStatus reports where
+# a job is. Jobs are identified by a dedup key, so repeating a request while
+# the first is still pending does not send the mail twice; once it was sent, a
+# new request sends it again unless the client passed its own dedup_key.
+# Setting EMAIL_OUTBOX_SQLITE swaps Azure storage for a local SQLite file (see
+# tools/drain_email_outbox.py and test/test_outbox.py).
+QUEUE_NAME = 'email-outbox'
+STATUS_TABLE = 'EmailOutbox'
+PDF_CONTAINER = 'email-outbox'
+MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', '5'))
+BACKOFF_BASE_SECONDS = int(os.getenv('EMAIL_BACKOFF_BASE_SECONDS', '30'))
+BACKOFF_MAX_SECONDS = int(os.getenv('EMAIL_BACKOFF_MAX_SECONDS', '3600'))
+
+PENDING = ('queued', 'sending', 'retrying')
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def dedup_key(job, pdf_base64=None):
+    # Identical requests map to the same job
+    payload = {key: job.get(key) for key in ('email', 'bar', 'seats', 'size')}
+    if pdf_base64:
+        payload['pdf'] = hashlib.sha256(pdf_base64.encode('ascii')).hexdigest()
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def backoff_seconds(attempts):
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+
+
+class TableOutbox:
+    _provisioned = False
+    _provision_lock = threading.Lock()
+
+    def __init__(self):
+        self.table = storage.get_table_client(STATUS_TABLE)
+        self.queue = storage.get_queue_client(QUEUE_NAME)
+        self.container = storage.get_container_client(PDF_CONTAINER)
+        self._provision()
+
+    def _provision(self):
+        with TableOutbox._provision_lock:
+            if TableOutbox._provisioned:
+                return
+            storage.get_table_service().create_table_if_not_exists(STATUS_TABLE)
+            for create in (self.queue.create_queue, self.container.create_container):
+                try:
+                    create()
+                except ResourceExistsError:
+                    pass
+            TableOutbox._provisioned = True
+
+    def create(self, job_id, email, keep=PENDING):
+        # Returns (record, created); an existing job is restarted unless its status is in keep
+        record = {"status": "queued", "attempts": 0, "email": email, "error": "", "updated_at": _now()}
+        try:
+            self.table.create_entity(entity={"PartitionKey": job_id, "RowKey": "status", **record})
+            return record, True
+        except ResourceExistsError:
+            existing = self.get(job_id)
+            if existing["status"] in keep:
+                return existing, False
+            self.update(job_id, **record)
+            return record, True
+
+    def get(self, job_id):
+        entities = list(self.table.query_entities(
+            query_filter="PartitionKey eq @id and RowKey eq 'status'", parameters={"id": job_id}))
+        if not entities:
+            return None
+        return {key: value for key, value in entities[0].items() if key not in ("PartitionKey", "RowKey")}
+
+    def update(self, job_id, **fields):
+        self.table.upsert_entity(entity={"PartitionKey": job_id, "RowKey": "status", "updated_at": _now(), **fields})
+
+    def schedule(self, job, delay_seconds=0):
+        self.queue.send_message(json.dumps(job), visibility_timeout=delay_seconds or None)
+
+    def save_pdf(self, job_id, pdf_base64):
+        self.container.upload_blob(f"{job_id}.b64", pdf_base64, overwrite=True)
+
+    def load_pdf(self, job):
+        return self.container.download_blob(f"{job['id']}.b64").readall().decode('ascii')
+
+    def delete_pdf(self, job_id):
+        try:
+            self.container.delete_blob(f"{job_id}.b64")
+        except ResourceNotFoundError:
+            pass
+
+
+class SqliteOutbox:
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, status TEXT, attempts INTEGER, email TEXT, error TEXT,
+                updated_at TEXT, payload TEXT, pdf TEXT, available_at REAL)""")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def create(self, job_id, email, keep=PENDING):
+        record = {"status": "queued", "attempts": 0, "email": email, "error": "", "updated_at": _now()}
+        existing = self.get(job_id)
+        if existing is not None and existing["status"] in keep:
+            return existing, False
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO jobs (id, status, attempts, email, error, updated_at) "
+                       "VALUES (:id, :status, :attempts, :email, :error, :updated_at)", {"id": job_id, **record})
+        return record, True
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute("SELECT status, attempts, email, error, updated_at FROM jobs WHERE id = ?",
+                             (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = _now()
+        assignments = ", ".join(f"{name} = :{name}" for name in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE id = :id", {"id": job_id, **fields})
+
+    def schedule(self, job, delay_seconds=0):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET payload = ?, available_at = ? WHERE id = ?",
+                       (json.dumps(job), time.time() + delay_seconds, job["id"]))
+
+    def due_jobs(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT payload FROM jobs WHERE payload IS NOT NULL AND available_at <= ? "
+                              "AND status IN ('queued', 'retrying')", (time.time(),)).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def save_pdf(self, job_id, pdf_base64):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET pdf = ? WHERE id = ?", (pdf_base64, job_id))
+
+    def load_pdf(self, job):
+        with self._connect() as db:
+            return db.execute("SELECT pdf FROM jobs WHERE id = ?", (job["id"],)).fetchone()["pdf"]
+
+    def delete_pdf(self, job_id):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET pdf = NULL WHERE id = ?", (job_id,))
+
+
+def get_outbox():
+    path = os.getenv('EMAIL_OUTBOX_SQLITE')
+    return SqliteOutbox(path) if path else TableOutbox()
+
+
+def enqueue(outbox, job, pdf_base64=None):
+    # Records and enqueues a job unless an identical one is still pending. A
+    # job id the client chose (its dedup_key) also matches a job already sent.
+    keep = PENDING + ('sent',) if job.get("id") else PENDING
+    job["id"] = job.get("id") or dedup_key(job, pdf_base64)
+    record, created = outbox.create(job["id"], job["email"], keep)
+    if created:
+        try:
+            if pdf_base64:
+                outbox.save_pdf(job["id"], pdf_base64)
+            outbox.schedule(job)
+        except Exception as e:
+            # Otherwise the job would stay "queued" with nothing to send it, and
+            # every retry would be told it is already queued
+            outbox.update(job["id"], status="failed", error=f"Could not enqueue: {e}")
+            raise
+    return job["id"], record, created
+
+
+def process(outbox, job, send):
+    # Sends one dequeued job. Failures are retried by re-enqueueing with an
+    # exponential delay rather than raising, so the host's own retries and the
+    # poison queue never see them.
+    record = outbox.get(job["id"])
+    if record is None or record["status"] not in PENDING:
+        logging.info(f"Skipping email job {job['id']}: {record and record['status']}")
+        return record
+
+    attempts = record["attempts"] + 1
+    outbox.update(job["id"], status="sending", attempts=attempts)
+    try:
+        send(job, outbox.load_pdf)
+    except ValueError as e:
+        # A job that cannot be composed (no seats, a bad size) fails the same
+        # way every time, so it is not retried
+        logging.error(f"Email job {job['id']} cannot be sent: {e}")
+        outbox.update(job["id"], status="failed", error=str(e))
+        outbox.delete_pdf(job["id"])
+        return outbox.get(job["id"])
+    except Exception as e:
+        if attempts >= MAX_ATTEMPTS:
+            logging.error(f"Email job {job['id']} failed after {attempts} attempts: {e}")
+            outbox.update(job["id"], status="failed", error=str(e))
+            outbox.delete_pdf(job["id"])
+        else:
+            delay = backoff_seconds(attempts)
+            logging.warning(f"Email job {job['id']} attempt {attempts} failed, retrying in {delay}s: {e}")
+            outbox.update(job["id"], status="retrying", error=str(e))
+            outbox.schedule(job, delay)
+        return outbox.get(job["id"])
+
+    outbox.update(job["id"], status="sent", error="")
+    outbox.delete_pdf(job["id"])
+    logging.info(f"Email job {job['id']} sent")
+    return outbox.get(job["id"])
@@ -0,0 +1,238 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+# Rendered QR images are a pure function of (data, options), so they are cached
+# per worker in an LRU bounded by total bytes, and served with a strong ETag
+# derived from the same key. Bump RENDER_VERSION whenever the output for a
+# given key changes so clients drop their copies.
+RENDER_VERSION = '2'
+CACHE_MAX_BYTES = int(os.getenv('QR_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MIMETYPES = {'png': 'image/png', 'svg': 'image/svg+xml', 'pbm': 'image/x-portable-bitmap'}
+MAX_SCALE = 40
+RENDER_PROCESSES = int(os.getenv('QR_RENDER_PROCESSES', str(os.cpu_count() or 1)))
+PARALLEL_THRESHOLD = 8  # below this, process start-up costs more than it saves
+
+# Sheet layout, matching what QRCodeGeneratorScreen used to build client-side
+PAGE_DPI = 150
+PAGE_SIZE_CM = (21.0, 29.7)
+MARGIN_CM = 1.0
+LABEL_CM = 0.8
+
+
+class ByteLRU:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+
+cache = ByteLRU(CACHE_MAX_BYTES)
+
+
+def cache_key(data, fmt='png', scale=10, border=4):
+    return (RENDER_VERSION, data, fmt, scale, border)
+
+
+def etag(key):
+    return '"' + hashlib.sha256(repr(key).encode('utf-8')).hexdigest() + '"'
+
+
+def _matrix(data, border):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()  # rows of booleans, True = dark, quiet zone included
+
+
+def _svg(matrix, scale):
+    # One horizontal run per path segment; the viewBox is in modules, so the
+    # document stays tiny whatever the printed size.
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size * scale}" height="{size * scale}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" fill="#000"/></svg>'
+    ).encode('utf-8')
+
+
+def _packed_rows(matrix, scale):
+    # PBM (P4) raster rows: one bit per pixel, 1 = black, rows padded to a byte
+    rows = []
+    for row in matrix:
+        bits = ''.join(('1' if dark else '0') * scale for dark in row)
+        bits += '0' * (-len(bits) % 8)
+        packed = int(bits, 2).to_bytes(len(bits) // 8, 'big')
+        rows.extend([packed] * scale)
+    return b''.join(rows)
+
+
+def _render(data, fmt='png', scale=10, border=4):
+    matrix = _matrix(data, border)
+    if fmt == 'svg':
+        return _svg(matrix, scale)
+    size = len(matrix) * scale
+    raster = _packed_rows(matrix, scale)
+    if fmt == 'pbm':
+        return f"P4\n{size} {size}\n".encode('ascii') + raster
+    img = Image.frombytes('1', (size, size), raster, 'raw', '1;I')
+    buf = io.BytesIO()
+    img.save(buf, format='PNG', optimize=True)
+    return buf.getvalue()
+
+
+def render(data, fmt='png', scale=10, border=4):
+    key = cache_key(data, fmt, scale, border)
+    body = cache.get(key)
+    if body is None:
+        body = _render(data, fmt, scale, border)
+        cache.put(key, body)
+    return body
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    # Spawned rather than forked: the worker host runs threads (and holds locks)
+    # that a forked child would inherit in whatever state they were in.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _render_args(args):
+    return _render(*args)
+
+
+def render_many(datas, fmt='png', scale=10, border=4):
+    # Renders every data string, using the cache where possible and spreading
+    # the misses over a process pool so multi-core workers render in parallel.
+    keys = [cache_key(data, fmt, scale, border) for data in datas]
+    bodies = [cache.get(key) for key in keys]
+    missing = [i for i, body in enumerate(bodies) if body is None]
+    args = [(datas[i], fmt, scale, border) for i in missing]
+    if len(missing) >= PARALLEL_THRESHOLD and RENDER_PROCESSES > 1:
+        rendered = _get_pool().map(_render_args, args, chunksize=max(1, len(args) // (RENDER_PROCESSES * 4)))
+    else:
+        rendered = map(_render_args, args)
+    for i, body in zip(missing, rendered):
+        cache.put(keys[i], body)
+        bodies[i] = body
+    return bodies
+
+
+def _cm_to_px(cm):
+    return int(round(cm / 2.54 * PAGE_DPI))
+
+
+def _label_font():
+    try:
+        return ImageFont.load_default(size=_cm_to_px(LABEL_CM) // 2)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def check_size(size_cm):
+    # Returns size_cm if a labelled QR code of that size fits on an A4 page;
+    # raises ValueError
+    page_width, page_height = PAGE_SIZE_CM
+    if not size_cm > 0:
+        raise ValueError("QR code size must be positive")
+    if size_cm + 2 * MARGIN_CM > page_width or size_cm + LABEL_CM + 2 * MARGIN_CM > page_height:
+        raise ValueError("QR code size does not fit on a page")
+    return size_cm
+
+
+def compose_pdf(labeled_pngs, size_cm=5.0):
+    # Lays (label, png) pairs out in a grid on A4 pages and returns the PDF bytes.
+    check_size(size_cm)
+    page_width, page_height = (_cm_to_px(cm) for cm in PAGE_SIZE_CM)
+    margin, label_height, size = _cm_to_px(MARGIN_CM), _cm_to_px(LABEL_CM), _cm_to_px(size_cm)
+    font = _label_font()
+
+    pages = []
+    x = y = margin
+    for label, png in labeled_pngs:
+        if not pages or y + label_height + size > page_height - margin:
+            pages.append(Image.new('1', (page_width, page_height), 1))
+            draw = ImageDraw.Draw(pages[-1])
+            x = y = margin
+        draw.text((x + size // 2, y + label_height // 2), label, fill=0, font=font, anchor='mm')
+        with Image.open(io.BytesIO(png)) as img:
+            pages[-1].paste(img.convert('1').resize((size, size), Image.NEAREST), (x, y + label_height))
+        x += size + margin
+        if x + size > page_width - margin:
+            x = margin
+            y += label_height + size + margin
+
+    if not pages:
+        raise ValueError("Nothing to put on the sheet")
+    buf = io.BytesIO()
+    pages[0].save(buf, format='PDF', save_all=True, append_images=pages[1:], resolution=PAGE_DPI)
+    return buf.getvalue()
+
+
+def compose_zip(named_pngs):
+    buf = io.BytesIO()
+    # PNGs are already deflated, so store them as-is
+    with zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, png in named_pngs:
+            archive.writestr(name, png)
+    return buf.getvalue()
@@ -0,0 +1,97 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from azure.storage.blob import ContentSettings
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+# Uploaded images are kept as sent, next to smaller re-encoded copies named
+# "<stem>_<rendition>.<ext>" (e.g. maps/a@b.com_thumb.webp), so clients can
+# derive a rendition's URL from the original one. Re-encoding drops EXIF and
+# other metadata; the orientation is applied to the pixels first.
+RENDITIONS = (
+    # name, longest side in px, quality
+    ('thumb', 128, 75),
+    ('medium', 512, 80),
+    ('full', int(os.getenv('IMAGE_FULL_MAX_PX', '2048')), 85),
+)
+FORMAT = os.getenv('IMAGE_RENDITION_FORMAT', 'webp').lower()
+if FORMAT == 'webp' and not features.check('webp'):
+    FORMAT = 'jpeg'
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+MIMETYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', str(min(len(RENDITIONS), os.cpu_count() or 1))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    # Threads rather than processes: Pillow drops the GIL while resampling and
+    # encoding, and the decoded image does not have to be pickled per task.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=RENDITION_WORKERS)
+        return _pool
+
+
+def rendition_name(blob_name, rendition, fmt=FORMAT):
+    stem = blob_name.rsplit('.', 1)[0] if '.' in blob_name else blob_name
+    return f"{stem}_{rendition}.{EXTENSIONS[fmt]}"
+
+
+def _open(data):
+    # Returns the decoded, upright image, or None if data (bytes or a binary
+    # stream) is not an image
+    try:
+        image = Image.open(io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data)
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        return None
+    image = ImageOps.exif_transpose(image)
+    if FORMAT == 'jpeg' or image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        if FORMAT == 'jpeg' and has_alpha:
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+    return image
+
+
+def _encode(image, max_px, quality):
+    if max(image.size) > max_px:
+        image = image.copy()
+        image.thumbnail((max_px, max_px), Image.LANCZOS)
+    out = io.BytesIO()
+    if FORMAT == 'webp':
+        image.save(out, format='WEBP', quality=quality, method=4)
+    else:
+        image.save(out, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def render(data):
+    # Returns {rendition: bytes}, or None if data is not an image
+    image = _open(data)
+    if image is None:
+        return None
+    futures = {name: _get_pool().submit(_encode, image, max_px, quality) for name, max_px, quality in RENDITIONS}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def store(container_client, blob_name, data, cache_control=None):
+    # Renders and uploads every rendition of an uploaded image, returning
+    # {rendition: url}; returns {} when the upload is not an image.
+    rendered = render(data)
+    if not rendered:
+        return {}
+    content_settings = ContentSettings(content_type=MIMETYPES[FORMAT], cache_control=cache_control)
+    uploads = {
+        name: _get_pool().submit(
+            container_client.upload_blob, rendition_name(blob_name, name), body,
+            overwrite=True, content_settings=content_settings)
+        for name, body in rendered.items()
+    }
+    return {name: future.result().url for name, future in uploads.items()}
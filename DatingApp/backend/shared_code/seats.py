@@ -0,0 +1,182 @@
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+from azure.data.tables import UpdateMode
+from shared_code import table_cache
+
+# Seats are rows of their bar's partition in BarTable, keyed "seat_<n>", and a
+# seat's QR code encodes "<bar id>;seat_<n>".
+SEAT_PREFIX = 'seat_'
+SEAT_RANGE_END = 'seat_~'
+
+
+def seat_number(seat_id):
+    suffix = seat_id[len(SEAT_PREFIX):]
+    return int(suffix) if suffix.isdigit() else float('inf')
+
+
+def seat_label(seat_id):
+    suffix = seat_id[len(SEAT_PREFIX):]
+    return f"Seat {suffix}" if suffix.isdigit() else seat_id
+
+
+def qr_data(bar_id, seat_id):
+    return f"{bar_id};{seat_id}"
+
+
+def list_seat_ids(table_client, bar_id):
+    entities = table_client.query_entities(
+        query_filter="PartitionKey eq @bar and RowKey ge @start and RowKey lt @end",
+        parameters={"bar": bar_id, "start": SEAT_PREFIX, "end": SEAT_RANGE_END},
+        select=["RowKey"],
+    )
+    return sorted((entity["RowKey"] for entity in entities), key=lambda seat_id: (seat_number(seat_id), seat_id))
+
+
+BARS_PARTITION = 'Bars'
+_INVALID_KEY_CHARS = set('/\\#?')
+
+
+def bar_exists(table_client, bar_id):
+    # Bars are rows of the "Bars" partition. A found bar goes through the read
+    # cache under the same filter ReadFromTable would use, so writes to the
+    # Bars partition invalidate it; a miss is not cached, so a bar added on
+    # another worker is found straight away.
+    if not bar_id or _INVALID_KEY_CHARS & set(bar_id):
+        return False
+    escaped = bar_id.replace("'", "''")
+    key = table_cache.make_key('BarTable', f"PartitionKey eq '{BARS_PARTITION}' and RowKey eq '{escaped}'", None, 'exists')
+    if table_cache.cache.get(key) is not None:
+        return True
+    generation = table_cache.cache.generation(key)
+    try:
+        table_client.get_entity(BARS_PARTITION, bar_id, select=["RowKey"])
+    except ResourceNotFoundError:
+        return False
+    table_cache.cache.put(key, '1', generation)
+    return True
+
+
+def bar_group(bar_id):
+    # SignalR group that receives one bar's seat events (see JoinBarGroup)
+    return f"{bar_id};seats"
+
+
+# Claims and releases. A seat row's connectedUser names who sits there, and a
+# user's row in the "Users" partition lists their seats as "bar;seat,bar;seat"
+# (one seat per bar). Seat rows are only changed with their ETag, so two people
+# scanning the same seat cannot both get it.
+USER_UPDATE_ATTEMPTS = 3
+
+
+class SeatTaken(Exception):
+    pass
+
+
+def parse_connected_seats(value):
+    seats = {}
+    for item in (value or '').split(','):
+        bar, _, seat = item.partition(';')
+        if bar and seat:
+            seats[bar] = seat
+    return seats
+
+
+def format_connected_seats(seats):
+    return ','.join(f"{bar};{seat}" for bar, seat in seats.items())
+
+
+def _set_seat_user(table_client, seat_entity, user):
+    table_client.update_entity(
+        mode=UpdateMode.MERGE,
+        entity={"PartitionKey": seat_entity["PartitionKey"], "RowKey": seat_entity["RowKey"], "connectedUser": user},
+        etag=seat_entity.metadata["etag"],
+        match_condition=MatchConditions.IfNotModified,
+    )
+
+
+def _free_seat(table_client, bar_id, seat_id, user):
+    # Frees the seat if user still holds it; returns whether it did
+    for _ in range(USER_UPDATE_ATTEMPTS):
+        try:
+            seat = table_client.get_entity(bar_id, seat_id)
+        except ResourceNotFoundError:
+            return False
+        if seat.get("connectedUser") != user:
+            return False
+        try:
+            _set_seat_user(table_client, seat, "")
+            return True
+        except ResourceModifiedError:
+            continue
+    return False
+
+
+def _update_user_seats(table_client, user, change):
+    # Applies change(seats) to the user's connectedSeats, retrying on conflicts.
+    # Returns (old seats, new seats).
+    for _ in range(USER_UPDATE_ATTEMPTS):
+        try:
+            entity = table_client.get_entity('Users', user)
+        except ResourceNotFoundError:
+            raise LookupError(f"Unknown user {user}")
+        old = parse_connected_seats(entity.get("connectedSeats"))
+        new = change(dict(old))
+        if new == old:
+            return old, new
+        try:
+            table_client.update_entity(
+                mode=UpdateMode.MERGE,
+                entity={"PartitionKey": 'Users', "RowKey": user, "connectedSeats": format_connected_seats(new)},
+                etag=entity.metadata["etag"],
+                match_condition=MatchConditions.IfNotModified,
+            )
+            return old, new
+        except ResourceModifiedError:
+            continue
+    raise ResourceModifiedError(f"connectedSeats of {user} kept changing")
+
+
+def claim(table_client, bar_id, seat_id, user):
+    # Seats user at bar_id/seat_id, freeing their previous seat in that bar.
+    # Returns (connected seats, previous seat id or None). Raises LookupError
+    # for an unknown seat or user and SeatTaken if someone else holds the seat.
+    try:
+        seat = table_client.get_entity(bar_id, seat_id)
+    except ResourceNotFoundError:
+        raise LookupError(f"Seat {seat_id} does not exist in {bar_id}")
+    holder = seat.get("connectedUser")
+    if holder and holder != user:
+        raise SeatTaken(f"Seat {seat_id} is already taken")
+    if not holder:
+        try:
+            _set_seat_user(table_client, seat, user)
+        except ResourceModifiedError:
+            raise SeatTaken(f"Seat {seat_id} was just taken")
+
+    def take(seats):
+        seats[bar_id] = seat_id
+        return seats
+    try:
+        old, new = _update_user_seats(table_client, user, take)
+    except Exception:
+        if not holder:
+            _free_seat(table_client, bar_id, seat_id, user)
+        raise
+
+    previous = old.get(bar_id)
+    if previous == seat_id or (previous and not _free_seat(table_client, bar_id, previous, user)):
+        previous = None
+    return new, previous
+
+
+def release(table_client, bar_id, seat_id, user):
+    # Frees the seat if user holds it and drops it from their seats.
+    # Returns (connected seats, whether the seat was freed).
+    freed = _free_seat(table_client, bar_id, seat_id, user)
+
+    def drop(seats):
+        if seats.get(bar_id) == seat_id:
+            del seats[bar_id]
+        return seats
+    _, new = _update_user_seats(table_client, user, drop)
+    return new, freed
@@ -0,0 +1,164 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import azure.functions as func
+from shared_code import seats, storage
+
+# Messages for the signalRDatingChat output binding. The binding takes a JSON
+# array as well as a single message, so a handler hands it everything it has
+# to send in one set() and the host sends them in one flush.
+MAX_BATCH = int(os.getenv('SIGNALR_MAX_BATCH', '500'))
+
+# negotiate issues client tokens itself, signed with the access key from the
+# SignalRAccessKey connection string, instead of going through the
+# signalRConnectionInfo binding. A user's connection info is reused for
+# NEGOTIATE_CACHE_FRACTION of the token lifetime, so a reused token always has
+# the rest of its lifetime left.
+HUB_NAME = 'datingChat'
+TOKEN_LIFETIME_SECONDS = int(os.getenv('NEGOTIATE_TOKEN_LIFETIME_SECONDS', '3600'))
+CACHE_FRACTION = float(os.getenv('NEGOTIATE_CACHE_FRACTION', '0.5'))
+CACHE_MAX_USERS = int(os.getenv('NEGOTIATE_CACHE_MAX_USERS', '4096'))
+
+
+def receive_message(group_name, user=None, other_user=None, message=None, timestamp=None):
+    # What clients get on "ReceiveMessage_<group>" (see useSignalR). Clients pick
+    # messages by that target name, so it goes to every connection.
+    return {
+        "target": "ReceiveMessage_" + group_name,
+        "arguments": [user, other_user, message, timestamp],
+    }
+
+
+def user_message(user_id, group_name, user=None, other_user=None, message=None, timestamp=None):
+    # Sent only to user_id's connections (negotiate binds them to the user) on
+    # the single "ReceiveMessage" target; the group name is the first argument
+    # so clients can route it as they route "ReceiveMessage_<group>".
+    return {
+        "target": "ReceiveMessage",
+        "userId": user_id,
+        "arguments": [group_name, user, other_user, message, timestamp],
+    }
+
+
+def from_request(item):
+    # Builds a message from a SendMessage-style body; raises ValueError
+    if not isinstance(item, dict) or not item.get('groupName'):
+        raise ValueError("Every message needs a groupName")
+    arguments = (item['groupName'], item.get('user'), item.get('otherUser'), item.get('message'), item.get('timestamp'))
+    if item.get('userId'):
+        return user_message(item['userId'], *arguments)
+    return receive_message(*arguments)
+
+
+def emit(out, messages):
+    messages = list(messages)
+    if len(messages) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} SignalR messages can be sent at once")
+    if messages:
+        out.set(json.dumps(messages[0] if len(messages) == 1 else messages))
+    return len(messages)
+
+
+def bar_group_request(req, out, action):
+    # JoinBarGroup (action "add") and LeaveBarGroup ("remove"): puts a
+    # connection, or every connection of a user, in or out of a bar's group
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        return func.HttpResponse("Invalid JSON body", status_code=400)
+
+    bar = req_body.get('bar')
+    user = req_body.get('user')
+    connection_id = req_body.get('connectionId')
+
+    if not bar or not (user or connection_id):
+        return func.HttpResponse("Missing bar, and user or connectionId", status_code=400)
+
+    try:
+        if not seats.bar_exists(storage.get_table_client('BarTable'), bar):
+            return func.HttpResponse(f"Unknown bar {bar}", status_code=404)
+    except Exception as e:
+        logging.error(f"Error reading bar: {e}")
+        return func.HttpResponse("Error reading bar", status_code=500)
+
+    groupName = seats.bar_group(bar)
+    joining = action == 'add'
+    logging.info(f"{'adding' if joining else 'removing'} {connection_id or user} {'to' if joining else 'from'} group name: {groupName}")
+
+    # A connection id targets just this client's connection; a user id needs a
+    # connection negotiated for that user
+    group_action = {'groupName': groupName, 'action': action}
+    if connection_id:
+        group_action['connectionId'] = connection_id
+    else:
+        group_action['userId'] = user
+    emit(out, [group_action])
+
+    return func.HttpResponse(f"group {'joined' if joining else 'left'} successfully", status_code=200)
+
+
+def _parse_connection_string(connection_string):
+    settings = dict(
+        part.split('=', 1) for part in connection_string.split(';') if '=' in part
+    )
+    endpoint = settings.get('Endpoint', '').rstrip('/')
+    if not endpoint or not settings.get('AccessKey'):
+        raise ValueError("SignalRAccessKey needs an Endpoint and an AccessKey")
+    if settings.get('Port'):
+        endpoint = f"{endpoint}:{settings['Port']}"
+    return endpoint, settings['AccessKey']
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _jwt(claims, key):
+    header = _b64url(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(',', ':')).encode('utf-8'))
+    payload = _b64url(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    signature = hmac.new(key.encode('utf-8'), f"{header}.{payload}".encode('ascii'), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64url(signature)}"
+
+
+def connection_info(user_id=None, now=None):
+    # {url, accessToken, expiresAt} for a client of the hub, bound to user_id
+    now = int(now or time.time())
+    endpoint, access_key = _parse_connection_string(os.environ['SignalRAccessKey'])
+    url = f"{endpoint}/client/?hub={HUB_NAME.lower()}"
+    claims = {"aud": url, "iat": now, "exp": now + TOKEN_LIFETIME_SECONDS}
+    if user_id:
+        claims["nameid"] = user_id
+    return {"url": url, "accessToken": _jwt(claims, access_key), "expiresAt": claims["exp"]}
+
+
+class ConnectionInfoCache:
+    def __init__(self, max_users=CACHE_MAX_USERS):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user id -> (reuse until, connection info)
+
+    def get(self, user_id):
+        # Returns (connection info, seconds it may still be reused)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1], int(entry[0] - now)
+        info = connection_info(user_id, now)
+        reuse_until = now + TOKEN_LIFETIME_SECONDS * CACHE_FRACTION
+        with self._lock:
+            self._entries[user_id] = (reuse_until, info)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return info, int(reuse_until - now)
+
+
+connection_info_cache = ConnectionInfoCache()
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+import requests
+from azure.core.pipeline.transport import RequestsTransport
+from azure.data.tables import TableServiceClient
+from azure.storage.blob import BlobServiceClient
+from azure.storage.queue import QueueClient, TextBase64EncodePolicy, TextBase64DecodePolicy
+
+# Clients are created once per worker process and reused by every invocation,
+# so the connection string is parsed and the HTTP pipeline / TLS sessions are
+# built only on the first request.
+POOL_SIZE = int(os.getenv('STORAGE_POOL_SIZE', '20'))
+KEEP_ALIVE = os.getenv('STORAGE_KEEP_ALIVE', 'true').lower() != 'false'
+CONNECTION_TIMEOUT = int(os.getenv('STORAGE_CONNECTION_TIMEOUT', '10'))
+READ_TIMEOUT = int(os.getenv('STORAGE_READ_TIMEOUT', '60'))
+# Uploads above the single-put size are split into blocks of this size
+BLOB_MAX_BLOCK_SIZE = int(os.getenv('BLOB_MAX_BLOCK_SIZE', str(4 * 1024 * 1024)))
+BLOB_MAX_SINGLE_PUT_SIZE = int(os.getenv('BLOB_MAX_SINGLE_PUT_SIZE', str(8 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_table_services = {}
+_blob_services = {}
+_table_clients = {}
+_container_clients = {}
+_queue_clients = {}
+
+
+def _transport():
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not KEEP_ALIVE:
+        session.headers['Connection'] = 'close'
+    return RequestsTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=CONNECTION_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+    )
+
+
+def get_table_service(connection_setting='AzureWebJobsStorage'):
+    service = _table_services.get(connection_setting)
+    if service is None:
+        with _lock:
+            service = _table_services.get(connection_setting)
+            if service is None:
+                logging.info(f'Creating pooled TableServiceClient for {connection_setting}')
+                service = TableServiceClient.from_connection_string(
+                    conn_str=os.getenv(connection_setting), transport=_transport())
+                _table_services[connection_setting] = service
+    return service
+
+
+def get_blob_service(connection_setting='AzureWebJobsStorage'):
+    service = _blob_services.get(connection_setting)
+    if service is None:
+        with _lock:
+            service = _blob_services.get(connection_setting)
+            if service is None:
+                logging.info(f'Creating pooled BlobServiceClient for {connection_setting}')
+                service = BlobServiceClient.from_connection_string(
+                    os.getenv(connection_setting), transport=_transport(),
+                    max_block_size=BLOB_MAX_BLOCK_SIZE, max_single_put_size=BLOB_MAX_SINGLE_PUT_SIZE)
+                _blob_services[connection_setting] = service
+    return service
+
+
+def get_table_client(table_name, connection_setting='AzureWebJobsStorage'):
+    key = (connection_setting, table_name)
+    table_client = _table_clients.get(key)
+    if table_client is None:
+        # The service takes the lock itself, so it is fetched first
+        service = get_table_service(connection_setting)
+        with _lock:
+            table_client = _table_clients.get(key)
+            if table_client is None:
+                table_client = service.get_table_client(table_name=table_name)
+                _table_clients[key] = table_client
+    return table_client
+
+
+def get_container_client(container_name, connection_setting='AzureWebJobsStorage'):
+    key = (connection_setting, container_name)
+    container_client = _container_clients.get(key)
+    if container_client is None:
+        service = get_blob_service(connection_setting)
+        with _lock:
+            container_client = _container_clients.get(key)
+            if container_client is None:
+                container_client = service.get_container_client(container_name)
+                _container_clients[key] = container_client
+    return container_client
+
+
+def get_queue_client(queue_name, connection_setting='AzureWebJobsStorage'):
+    # Base64 messages, which is what the Functions queue trigger expects by default
+    key = (connection_setting, queue_name)
+    queue_client = _queue_clients.get(key)
+    if queue_client is None:
+        with _lock:
+            queue_client = _queue_clients.get(key)
+            if queue_client is None:
+                queue_client = QueueClient.from_connection_string(
+                    os.getenv(connection_setting), queue_name, transport=_transport(),
+                    message_encode_policy=TextBase64EncodePolicy(),
+                    message_decode_policy=TextBase64DecodePolicy())
+                _queue_clients[key] = queue_client
+    return queue_client
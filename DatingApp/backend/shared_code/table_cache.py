@@ -0,0 +1,197 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from shared_code import chat
+
+# In-worker read cache for ReadFromTable. Entries expire after a TTL, the
+# least recently used ones are evicted past the size bounds, and every write
+# handler invalidates the partitions it touched. Other workers only see a
+# write once their own entry expires, so only rarely changing partitions
+# (Bars, Menu) are cached by default; other reads opt in with cache: true,
+# and chats and Users rows are never cached.
+TTL_SECONDS = float(os.getenv('READ_CACHE_TTL_SECONDS', '30'))
+MAX_ENTRIES = int(os.getenv('READ_CACHE_MAX_ENTRIES', '512'))
+MAX_BYTES = int(os.getenv('READ_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+# Past this many partitions with a write counter, the counters start over
+MAX_GENERATIONS = int(os.getenv('READ_CACHE_MAX_GENERATIONS', '4096'))
+
+_PARTITION_EQ = re.compile(r"PartitionKey\s+eq\s+'((?:[^']|'')*)'")
+_PARTITION_ANY = re.compile(r"PartitionKey\s+(eq|ne|gt|ge|lt|le)\b")
+_OR = re.compile(r"\bor\b|\bnot\b", re.IGNORECASE)
+
+
+def normalize_filter(query_filter):
+    # Collapse whitespace outside of string literals so equivalent filters share an entry
+    parts = re.split(r"('(?:[^']|'')*')", query_filter or '')
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts)).strip()
+
+
+def partitions_for_filter(query_filter):
+    # Returns the set of partitions a filter can read from, or None when it may
+    # span the whole table (no PartitionKey equality, range scans, or/not).
+    if not query_filter or _OR.search(query_filter):
+        return None
+    partitions = {value.replace("''", "'") for value in _PARTITION_EQ.findall(query_filter)}
+    if len(partitions) != 1 or len(_PARTITION_ANY.findall(query_filter)) != len(_PARTITION_EQ.findall(query_filter)):
+        return None
+    return partitions
+
+
+DEFAULT_CACHED_PARTITIONS = {('BarTable', 'Bars'), ('BarTable', 'Menu')}
+
+
+def _never_cached(partition_key):
+    return (partition_key == 'Users' or partition_key.endswith(';chat')
+            or chat.is_conversation_key(partition_key))
+
+
+def is_cacheable(table_name, query_filter, requested=None):
+    # requested is the request's "cache" flag: False never caches, True opts in
+    # a single-partition read that is not a chat or Users read
+    if requested is False:
+        return False
+    partitions = partitions_for_filter(query_filter)
+    if partitions is None or any(_never_cached(partition) for partition in partitions):
+        return False
+    return requested is True or all((table_name, partition) in DEFAULT_CACHED_PARTITIONS for partition in partitions)
+
+
+def make_key(table_name, query_filter, select=None, *extra):
+    return (table_name, normalize_filter(query_filter), tuple(select or ())) + extra
+
+
+class TableReadCache:
+    def __init__(self, ttl_seconds=TTL_SECONDS, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value, size, index keys)
+        self._index = {}  # (table, partition or None) -> set of cache keys
+        self._bytes = 0
+        # Bumped on every invalidation of a (table, partition), of a table as a
+        # whole (table, None), and of all tables (epoch). A read takes them with
+        # generation() before it queries storage, and put() drops the result if
+        # a write invalidated what it read in the meantime.
+        self._generations = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, key):
+        with self._lock:
+            return self._generation(self._index_keys(key))
+
+    def put(self, key, value, generation=None):
+        size = len(value)
+        if self.ttl_seconds <= 0 or size > self.max_bytes:
+            return
+        index_keys = self._index_keys(key)
+        with self._lock:
+            if generation is not None and generation != self._generation(index_keys):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, size, index_keys)
+            self._bytes += size
+            for index_key in index_keys:
+                self._index.setdefault(index_key, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, table_name, partition_keys=None):
+        # Table-wide reads are dropped on every write to the table; partition-scoped
+        # reads only when their partition is written. No partition means "anything".
+        with self._lock:
+            if len(self._generations) >= MAX_GENERATIONS:
+                self._generations.clear()
+                self._epoch += 1
+            self._bump((table_name, None))
+            if partition_keys is None:
+                self._bump(table_name)
+                keys = [key for key in self._entries if key[0] == table_name]
+            else:
+                for partition_key in partition_keys:
+                    self._bump((table_name, partition_key))
+                keys = set(self._index.get((table_name, None), ()))
+                for partition_key in partition_keys:
+                    keys.update(self._index.get((table_name, partition_key), ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    @staticmethod
+    def _index_keys(key):
+        table_name, query_filter = key[0], key[1]
+        partitions = partitions_for_filter(query_filter)
+        return [(table_name, None)] if partitions is None else [(table_name, p) for p in partitions]
+
+    def _generation(self, index_keys):
+        # A partition-scoped read also goes stale when its whole table is invalidated
+        table_name = index_keys[0][0]
+        return (self._epoch, self._generations.get(table_name, 0),
+                tuple(self._generations.get(index_key, 0) for index_key in index_keys))
+
+    def _bump(self, generation_key):
+        self._generations[generation_key] = self._generations.get(generation_key, 0) + 1
+
+    def _remove(self, key):
+        _, _, size, index_keys = self._entries.pop(key)
+        self._bytes -= size
+        for index_key in index_keys:
+            keys = self._index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[index_key]
+
+
+cache = TableReadCache()
+
+
+def invalidate(table_name, partition_keys=None):
+    cache.invalidate(table_name, partition_keys)
@@ -0,0 +1,66 @@
+import logging
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError
+from azure.data.tables import TableTransactionError, UpdateMode
+
+MAX_TRANSACTION_SIZE = 100  # Table storage limit for a single entity group transaction
+
+# action -> (transaction operation, update mode)
+ACTIONS = {
+    'create': ('create', None),
+    'upsert': ('upsert', UpdateMode.MERGE),
+    'merge': ('update', UpdateMode.MERGE),
+    'update': ('update', UpdateMode.MERGE),
+    'replace': ('update', UpdateMode.REPLACE),
+    'delete': ('delete', None),
+}
+
+
+def to_operation(action, entity, etag=None):
+    if action not in ACTIONS:
+        raise ValueError(f"Unsupported action: {action}")
+    if not isinstance(entity, dict) or 'PartitionKey' not in entity or 'RowKey' not in entity:
+        raise ValueError("Entity must include PartitionKey and RowKey")
+    operation, mode = ACTIONS[action]
+    kwargs = {}
+    if mode is not None:
+        kwargs['mode'] = mode
+    if etag and operation in ('update', 'delete'):
+        kwargs['etag'] = etag
+        kwargs['match_condition'] = MatchConditions.IfNotModified
+    return (operation, entity, kwargs)
+
+
+def chunks(items, size=MAX_TRANSACTION_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def submit_by_partition(table_client, operations):
+    # Groups operations by PartitionKey and submits each group in transactions of
+    # at most 100. Returns one result per operation, in the order given.
+    # Operations in the same transaction succeed or fail together.
+    partitions = {}
+    for index, operation in enumerate(operations):
+        partitions.setdefault(operation[1]['PartitionKey'], []).append(index)
+
+    results = [None] * len(operations)
+    for partition_key, indexes in partitions.items():
+        for chunk in chunks(indexes):
+            try:
+                responses = table_client.submit_transaction([operations[i] for i in chunk])
+                for i, response in zip(chunk, responses):
+                    results[i] = {"index": i, "status": 200, "etag": response.get('etag')}
+            except TableTransactionError as e:
+                logging.error(f"Transaction failed for partition {partition_key}: {e.message}")
+                failed = chunk[e.index] if e.index < len(chunk) else None
+                for i in chunk:
+                    if i == failed:
+                        results[i] = {"index": i, "status": e.status_code or 400, "error": e.message}
+                    else:
+                        results[i] = {"index": i, "status": 424, "error": "Transaction aborted"}
+            except HttpResponseError as e:
+                logging.error(f"Transaction failed for partition {partition_key}: {e.message}")
+                for i in chunk:
+                    results[i] = {"index": i, "status": e.status_code or 500, "error": e.message}
+    return results
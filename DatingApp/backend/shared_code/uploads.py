@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.storage.blob import BlobSasPermissions, ContentSettings, generate_blob_sas
+from shared_code import renditions, storage, table_cache
+
+# Direct-to-storage uploads: GetUploadSAS records a pending grant in BarTable
+# (partition "Uploads") and hands out a short-lived SAS that can only create or
+# write that one blob. A SAS cannot limit size or content type, so
+# CompleteUpload checks the stored blob against the grant and deletes it if it
+# does not match.
+UPLOADS_PARTITION = 'Uploads'
+ALLOWED_CONTAINERS = set(os.getenv('UPLOAD_CONTAINERS', 'maps,uploads').split(','))
+ALLOWED_CONTENT_TYPES = {'image/png', 'image/jpeg', 'image/webp', 'image/gif'}
+MAX_UPLOAD_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(20 * 1024 * 1024)))
+SAS_MINUTES = int(os.getenv('UPLOAD_SAS_MINUTES', '5'))
+PROCESS_QUEUE = 'upload-process'
+MAX_CONCURRENCY = int(os.getenv('UPLOAD_MAX_CONCURRENCY', '4'))
+
+# Uploads are content-addressed: they are kept as objects/<md5>.<ext>, which
+# never changes once written and is served as immutable, and rows (a user's
+# profilePictureUrl, a bar's mapUrl) store that URL. MD5 because Blob storage
+# computes it for every single-shot upload, so a direct upload can be named
+# without the function reading it. BarTable partition "BlobIndex" records the
+# objects whose renditions exist, so re-saving unchanged bytes writes nothing.
+CONTENT_PREFIX = 'objects/'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+EXTENSIONS = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/webp': 'webp', 'image/gif': 'gif'}
+INDEX_PARTITION = 'BlobIndex'
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def validate(container_name, blob_name, content_type=None, size=None):
+    if container_name not in ALLOWED_CONTAINERS:
+        raise ValueError(f"Uploads to {container_name} are not allowed")
+    if not blob_name or '/' in blob_name or '\\' in blob_name or '#' in blob_name or '?' in blob_name:
+        raise ValueError("Invalid blob_name")
+    if content_type is not None and content_type not in ALLOWED_CONTENT_TYPES:
+        raise ValueError(f"Content type {content_type} is not allowed")
+    if size is not None and (size < 1 or size > MAX_UPLOAD_BYTES):
+        raise ValueError(f"size must be between 1 and {MAX_UPLOAD_BYTES} bytes")
+
+
+def row_key(container_name, blob_name):
+    return f"{container_name};{blob_name}"
+
+
+def grant(container_name, blob_name, content_type, size):
+    blob_client = storage.get_container_client(container_name).get_blob_client(blob_name)
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(minutes=SAS_MINUTES)
+    sas = generate_blob_sas(
+        account_name=blob_client.account_name,
+        container_name=container_name,
+        blob_name=blob_name,
+        account_key=blob_client.credential.account_key,
+        permission=BlobSasPermissions(create=True, write=True),
+        start=now - timedelta(minutes=1),  # tolerate clock skew
+        expiry=expires_at,
+        content_type=content_type,
+    )
+    storage.get_table_client('BarTable').upsert_entity(entity={
+        "PartitionKey": UPLOADS_PARTITION,
+        "RowKey": row_key(container_name, blob_name),
+        "status": "pending",
+        "contentType": content_type,
+        "maxBytes": size,
+        "expiresAt": expires_at.isoformat(),
+    })
+    table_cache.invalidate('BarTable', [UPLOADS_PARTITION])
+    return {
+        "upload_url": f"{blob_client.url}?{sas}",
+        "blob_url": blob_client.url,
+        "expires_at": expires_at.isoformat(),
+        "max_bytes": size,
+        "headers": {"x-ms-blob-type": "BlockBlob", "Content-Type": content_type},
+    }
+
+
+def complete(container_name, blob_name):
+    # Checks the uploaded blob against its grant and moves it to its content
+    # name. Raises ValueError (after deleting the blob if it broke the grant's limits).
+    table_client = storage.get_table_client('BarTable')
+    try:
+        upload = table_client.get_entity(UPLOADS_PARTITION, row_key(container_name, blob_name))
+    except ResourceNotFoundError:
+        raise ValueError("No upload was granted for this blob")
+
+    blob_client = storage.get_container_client(container_name).get_blob_client(blob_name)
+    try:
+        properties = blob_client.get_blob_properties()
+    except ResourceNotFoundError:
+        raise ValueError("The blob has not been uploaded")
+
+    content_type = properties.content_settings.content_type
+    record = {
+        "PartitionKey": UPLOADS_PARTITION,
+        "RowKey": row_key(container_name, blob_name),
+        "size": properties.size,
+        "contentType": content_type,
+        "url": blob_client.url,
+    }
+    try:
+        if properties.size > upload["maxBytes"] or content_type != upload["contentType"]:
+            blob_client.delete_blob()
+            table_client.upsert_entity(entity={**record, "status": "rejected"})
+            raise ValueError(f"Upload of {properties.size} bytes of {content_type} does not match the grant")
+        object_client = _move_to_content_name(blob_client, properties)
+        table_client.upsert_entity(entity={
+            **record,
+            "status": "complete",
+            "url": object_client.url,
+            "completedAt": datetime.now(timezone.utc).isoformat(),
+        })
+    finally:
+        table_cache.invalidate('BarTable', [UPLOADS_PARTITION])
+    # Renditions need the bytes, which this request never had; ProcessUpload
+    # renders them from a queue so the upload stays off the request path
+    enqueue_processing(container_name, object_client.blob_name, properties.size, content_type)
+    return {"url": object_client.url, "size": properties.size, "content_type": content_type, "renditions": "pending"}
+
+
+def _move_to_content_name(blob_client, properties):
+    # Server-side copy of a direct upload to objects/<md5>.<ext>, then drops the
+    # upload. Without a stored MD5 (which Put Blob always sets) it stays where it is.
+    md5 = properties.content_settings.content_md5
+    if not md5:
+        return blob_client
+    content_type = properties.content_settings.content_type
+    container_client = storage.get_container_client(blob_client.container_name)
+    object_client = container_client.get_blob_client(content_name(bytes(md5).hex(), blob_client.blob_name, content_type))
+    if not object_client.exists():
+        sas = generate_blob_sas(
+            account_name=blob_client.account_name,
+            container_name=blob_client.container_name,
+            blob_name=blob_client.blob_name,
+            account_key=blob_client.credential.account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.now(timezone.utc) + timedelta(minutes=SAS_MINUTES),
+        )
+        object_client.start_copy_from_url(f"{blob_client.url}?{sas}", requires_sync=True)
+        object_client.set_http_headers(content_settings=ContentSettings(
+            content_type=content_type, content_md5=md5, cache_control=IMMUTABLE_CACHE_CONTROL))
+    blob_client.delete_blob()
+    return object_client
+
+
+def enqueue_processing(container_name, blob_name, size, content_type):
+    queue_client = storage.get_queue_client(PROCESS_QUEUE)
+    message = json.dumps({"container_name": container_name, "blob_name": blob_name,
+                          "size": size, "content_type": content_type})
+    try:
+        queue_client.send_message(message)
+    except ResourceNotFoundError:
+        try:
+            queue_client.create_queue()
+        except ResourceExistsError:
+            pass
+        queue_client.send_message(message)
+
+
+def process_direct_upload(container_name, blob_name, size, content_type):
+    # Queue-side half of complete(): renders and indexes the stored object
+    container_client = storage.get_container_client(container_name)
+    entry = _index_entry(container_name, blob_name)
+    if entry is not None:
+        return {"url": container_client.get_blob_client(blob_name).url,
+                "renditions": json.loads(entry.get("renditions") or "{}"), "deduplicated": True}
+    data = container_client.get_blob_client(blob_name).download_blob().readall()
+    return _index(container_name, blob_name, data, size)
+
+
+def index_key(container_name, blob_name):
+    # RowKeys may not contain / \ # or ?, which blob names can
+    return f"{container_name};{quote(blob_name, safe='@;')}"
+
+
+def content_hash(data):
+    # MD5 of data (bytes or a seekable stream, which is hashed in chunks and left at its start)
+    if isinstance(data, (bytes, bytearray)):
+        return hashlib.md5(data).hexdigest()
+    digest = hashlib.md5()
+    data.seek(0)
+    for chunk in iter(lambda: data.read(HASH_CHUNK_BYTES), b''):
+        digest.update(chunk)
+    data.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(digest, blob_name, content_type=None):
+    # objects/<digest>.<ext>, the extension taken from the content type or else the uploaded name
+    extension = EXTENSIONS.get(content_type) or (blob_name.rsplit('.', 1)[1].lower() if '.' in blob_name else 'bin')
+    return f"{CONTENT_PREFIX}{digest}.{extension}"
+
+
+def _index_entry(container_name, blob_name):
+    try:
+        return storage.get_table_client('BarTable').get_entity(INDEX_PARTITION, index_key(container_name, blob_name))
+    except ResourceNotFoundError:
+        return None
+
+
+def _index(container_name, blob_name, data, length):
+    # Renders the stored object's renditions and records them
+    urls = renditions.store(storage.get_container_client(container_name), blob_name, data, IMMUTABLE_CACHE_CONTROL)
+    storage.get_table_client('BarTable').upsert_entity(entity={
+        "PartitionKey": INDEX_PARTITION,
+        "RowKey": index_key(container_name, blob_name),
+        "size": length,
+        "renditions": json.dumps(urls),
+    })
+    table_cache.invalidate('BarTable', [INDEX_PARTITION])
+    return {"url": storage.get_container_client(container_name).get_blob_client(blob_name).url,
+            "renditions": urls, "deduplicated": False}
+
+
+def store(container_name, blob_name, data, length, content_type=None):
+    # Stores data (bytes or a seekable stream) under its content name, unless
+    # that object is already there. blob_name only supplies a fallback
+    # extension. Returns {url, renditions, deduplicated}.
+    name = content_name(content_hash(data), blob_name, content_type)
+    entry = _index_entry(container_name, name)
+    object_client = storage.get_container_client(container_name).get_blob_client(name)
+    if entry is not None:
+        return {"url": object_client.url, "renditions": json.loads(entry.get("renditions") or "{}"), "deduplicated": True}
+
+    try:
+        object_client.upload_blob(data, length=length, overwrite=False, max_concurrency=MAX_CONCURRENCY,
+                                  content_settings=ContentSettings(content_type=content_type,
+                                                                   cache_control=IMMUTABLE_CACHE_CONTROL))
+    except ResourceExistsError:
+        pass  # same name, so the same bytes
+    if hasattr(data, 'seek'):
+        data.seek(0)
+    return _index(container_name, name, data, length)
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+from shared_code import outbox
+
+
+class SqliteOutboxTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(handle)
+        self.box = outbox.SqliteOutbox(self.path)
+        self.sent = []
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def send(self, job, load_pdf):
+        self.sent.append((job["id"], load_pdf(job)))
+
+    def fail(self, job, load_pdf):
+        raise RuntimeError("smtp down")
+
+    def enqueue(self, pdf_base64="cGRm", **job):
+        job = {"email": "a@b.com", "bar": "1", **job}
+        return outbox.enqueue(self.box, job, pdf_base64)
+
+    def available_at(self, job_id):
+        with self.box._connect() as db:
+            return db.execute("SELECT available_at FROM jobs WHERE id = ?", (job_id,)).fetchone()["available_at"]
+
+    def test_sends_and_deletes_pdf(self):
+        job_id, _, created = self.enqueue()
+        self.assertTrue(created)
+        [job] = self.box.due_jobs()
+        record = outbox.process(self.box, job, self.send)
+        self.assertEqual(record["status"], "sent")
+        self.assertEqual(self.sent, [(job_id, "cGRm")])
+        self.assertIsNone(self.box.load_pdf(job))
+        self.assertEqual(self.box.due_jobs(), [])
+
+    def test_retries_with_backoff(self):
+        job_id, _, _ = self.enqueue()
+        [job] = self.box.due_jobs()
+        record = outbox.process(self.box, job, self.fail)
+        self.assertEqual(record["status"], "retrying")
+        self.assertEqual(record["attempts"], 1)
+        self.assertEqual(record["error"], "smtp down")
+        delay = self.available_at(job_id) - outbox.time.time()
+        self.assertAlmostEqual(delay, outbox.backoff_seconds(1), delta=5)
+        self.assertEqual(self.box.due_jobs(), [])
+
+        outbox.process(self.box, job, self.fail)
+        delay = self.available_at(job_id) - outbox.time.time()
+        self.assertAlmostEqual(delay, outbox.backoff_seconds(2), delta=5)
+
+    def test_backoff_doubles_up_to_max(self):
+        self.assertEqual(outbox.backoff_seconds(2), 2 * outbox.backoff_seconds(1))
+        self.assertEqual(outbox.backoff_seconds(100), outbox.BACKOFF_MAX_SECONDS)
+
+    def test_fails_after_max_attempts(self):
+        self.enqueue()
+        [job] = self.box.due_jobs()
+        for _ in range(outbox.MAX_ATTEMPTS):
+            record = outbox.process(self.box, job, self.fail)
+        self.assertEqual(record["status"], "failed")
+        self.assertEqual(record["attempts"], outbox.MAX_ATTEMPTS)
+        self.assertIsNone(self.box.load_pdf(job))
+        self.assertEqual(outbox.process(self.box, job, self.send)["status"], "failed")
+        self.assertEqual(self.sent, [])
+
+    def test_value_error_fails_at_once(self):
+        self.enqueue()
+        [job] = self.box.due_jobs()
+
+        def invalid(job, load_pdf):
+            raise ValueError("No seats found")
+
+        record = outbox.process(self.box, job, invalid)
+        self.assertEqual(record["status"], "failed")
+        self.assertEqual(record["attempts"], 1)
+        self.assertEqual(record["error"], "No seats found")
+        self.assertIsNone(self.box.load_pdf(job))
+        self.assertEqual(self.box.due_jobs(), [])
+
+    def test_dedups_pending_job(self):
+        job_id, _, created = self.enqueue()
+        self.assertTrue(created)
+        same_id, record, created = self.enqueue()
+        self.assertEqual(same_id, job_id)
+        self.assertFalse(created)
+        self.assertEqual(record["status"], "queued")
+        self.assertEqual(len(self.box.due_jobs()), 1)
+
+    def test_resends_after_sent(self):
+        self.enqueue()
+        [job] = self.box.due_jobs()
+        outbox.process(self.box, job, self.send)
+        _, record, created = self.enqueue()
+        self.assertTrue(created)
+        self.assertEqual(record["status"], "queued")
+        [job] = self.box.due_jobs()
+        outbox.process(self.box, job, self.send)
+        self.assertEqual(len(self.sent), 2)
+
+    def test_explicit_key_dedups_sent_job(self):
+        self.enqueue(id="client-key")
+        [job] = self.box.due_jobs()
+        outbox.process(self.box, job, self.send)
+        _, record, created = self.enqueue(id="client-key")
+        self.assertFalse(created)
+        self.assertEqual(record["status"], "sent")
+
+    def test_failed_schedule_does_not_block_retry(self):
+        schedule = self.box.schedule
+
+        def broken(job, delay_seconds=0):
+            raise RuntimeError("queue down")
+
+        self.box.schedule = broken
+        with self.assertRaises(RuntimeError):
+            self.enqueue()
+        self.box.schedule = schedule
+        _, record, created = self.enqueue()
+        self.assertTrue(created)
+        self.assertEqual(len(self.box.due_jobs()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+from shared_code.table_cache import TableReadCache, make_key
+
+
+class TableReadCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = TableReadCache(ttl_seconds=30)
+        self.key = make_key('BarTable', "PartitionKey eq 'Bars'")
+
+    def test_put_after_invalidate_is_dropped(self):
+        generation = self.cache.generation(self.key)
+        self.cache.invalidate('BarTable', ['Bars'])
+        self.cache.put(self.key, 'stale', generation)
+        self.assertIsNone(self.cache.get(self.key))
+
+    def test_other_partition_write_keeps_put(self):
+        generation = self.cache.generation(self.key)
+        self.cache.invalidate('BarTable', ['Menu'])
+        self.cache.put(self.key, 'fresh', generation)
+        self.assertEqual(self.cache.get(self.key), 'fresh')
+
+    def test_table_wide_invalidate_drops_partition_reads(self):
+        generation = self.cache.generation(self.key)
+        self.cache.invalidate('BarTable')
+        self.cache.put(self.key, 'stale', generation)
+        self.assertIsNone(self.cache.get(self.key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""Send due jobs from a local SQLite email outbox.
+
+Stands in for the SendEmailWorker queue trigger when EMAIL_OUTBOX_SQLITE is
+set. Run from DatingApp/backend:
+
+    python -m tools.drain_email_outbox [--loop]
+"""
+import argparse
+import logging
+import time
+from shared_code import mailer, outbox
+
+
+def drain(box, send=mailer.send_qr_job):
+    jobs = box.due_jobs()
+    for job in jobs:
+        outbox.process(box, job, send)
+    return len(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--loop', action='store_true', help='keep polling for due jobs')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    box = outbox.get_outbox()
+    if not isinstance(box, outbox.SqliteOutbox):
+        parser.error('EMAIL_OUTBOX_SQLITE is not set')
+    while True:
+        logging.info(f"Processed {drain(box)} email jobs")
+        if not args.loop:
+            return
+        time.sleep(5)
+
+
+if __name__ == '__main__':
+    main()
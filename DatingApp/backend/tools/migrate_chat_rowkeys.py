@@ -0,0 +1,59 @@
+"""Rewrite legacy chat rows to inverted-timestamp RowKeys.
+
+Run from DatingApp/backend with AzureWebJobsStorage set:
+
+    python -m tools.migrate_chat_rowkeys [--table BarTable] [--dry-run]
+
+Every message row in an "a;b" conversation partition whose RowKey is still the
+raw send time is copied to chat.message_row_key(...) and the original deleted,
+both in the same partition transaction. The new key is derived from the old
+one, so re-running the tool is safe.
+"""
+import argparse
+import hashlib
+import logging
+from shared_code import chat, storage, transactions
+
+
+def legacy_operations(table_client):
+    operations = []
+    skipped = 0
+    for entity in table_client.list_entities():
+        partition_key, row_key = entity['PartitionKey'], entity['RowKey']
+        if not chat.is_conversation_key(partition_key) or row_key.startswith(chat.MESSAGE_PREFIX):
+            continue
+        try:
+            timestamp_ms = chat.parse_timestamp_ms(row_key)
+        except ValueError:
+            logging.warning(f"Skipping {partition_key}/{row_key}: RowKey is not a timestamp")
+            skipped += 1
+            continue
+        migrated = dict(entity)
+        migrated['RowKey'] = chat.message_row_key(timestamp_ms, hashlib.sha1(row_key.encode('utf-8')).hexdigest()[:8])
+        # Copy and delete stay adjacent, and transactions are cut every 100
+        # operations, so each pair always lands in the same transaction.
+        operations.append(transactions.to_operation('upsert', migrated))
+        operations.append(transactions.to_operation('delete', {'PartitionKey': partition_key, 'RowKey': row_key}))
+    return operations, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--table', default='BarTable')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    table_client = storage.get_table_client(args.table)
+    operations, skipped = legacy_operations(table_client)
+    logging.info(f"{len(operations) // 2} legacy chat rows to migrate, {skipped} skipped")
+    if args.dry_run or not operations:
+        return
+
+    results = transactions.submit_by_partition(table_client, operations)
+    failed = sum(1 for result in results if result['status'] != 200)
+    logging.info(f"Migrated {(len(results) - failed) // 2} rows, {failed // 2} failed")
+
+
+if __name__ == '__main__':
+    main()
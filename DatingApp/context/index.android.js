@@ -5,6 +5,7 @@ const SharedStateContext = createContext();
 
 const SharedStateProvider = ({ children }) => {
   const [email, setEmail] = useState('');
+  const [authToken, setAuthToken] = useState('');
   const [otherEmail, setOtherEmail] = useState('');
   const [firstName, setFirstName] = useState('');
   const [lastName, setLastName] = useState('');
@@ -20,6 +21,9 @@ const SharedStateProvider = ({ children }) => {
         const storedEmail = await AsyncStorage.getItem('userEmail');
         if (storedEmail) setEmail(storedEmail);
 
+        const storedAuthToken = await AsyncStorage.getItem('authToken');
+        if (storedAuthToken) setAuthToken(storedAuthToken);
+
         const storedFirstName = await AsyncStorage.getItem('userFirstName');
         if (storedFirstName) setFirstName(storedFirstName);
 
@@ -53,6 +57,11 @@ const SharedStateProvider = ({ children }) => {
     await AsyncStorage.setItem('userEmail', email);
   };
 
+  const saveAuthToken = async (authToken) => {
+    setAuthToken(authToken);
+    await AsyncStorage.setItem('authToken', authToken);
+  };
+
   const saveFirstName = async (firstName) => {
     setFirstName(firstName);
     await AsyncStorage.setItem('userFirstName', firstName);
@@ -93,6 +102,8 @@ const SharedStateProvider = ({ children }) => {
       value={{
         email,
         setEmail: saveEmail,
+        authToken,
+        setAuthToken: saveAuthToken,
         firstName,
         setFirstName: saveFirstName,
         lastName,
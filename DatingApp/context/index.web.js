@@ -4,6 +4,7 @@ const SharedStateContext = createContext();
 
 const SharedStateProvider = ({ children }) => {
   const [email, setEmail] = useState('');
+  const [authToken, setAuthToken] = useState('');
   const [otherEmail, setOtherEmail] = useState('');
   const [firstName, setFirstName] = useState('');
   const [lastName, setLastName] = useState('');
@@ -19,6 +20,10 @@ const SharedStateProvider = ({ children }) => {
     if (storedEmail) {
       setEmail(storedEmail);
     }
+    const storedAuthToken = localStorage.getItem('authToken');
+    if (storedAuthToken) {
+      setAuthToken(storedAuthToken);
+    }
     const storedFirstName = localStorage.getItem('userFirstName');
     if (storedFirstName) {
       setFirstName(storedFirstName);
@@ -67,6 +72,11 @@ const SharedStateProvider = ({ children }) => {
     localStorage.setItem('userEmail', email);
   };
 
+  const saveAuthToken = (authToken) => {
+    setAuthToken(authToken);
+    localStorage.setItem('authToken', authToken);
+  };
+
   const saveFirstName = (firstName) => {
     console.log('Saving to context - first name:', firstName);
     setFirstName(firstName);
@@ -112,6 +122,8 @@ const SharedStateProvider = ({ children }) => {
     <SharedStateContext.Provider value={{
       email,
       setEmail: saveEmail,
+      authToken,
+      setAuthToken: saveAuthToken,
       firstName,
       setFirstName: saveFirstName,
       lastName,
@@ -3,6 +3,7 @@ import { View, StyleSheet, Text, Button, Image, Dimensions, TouchableWithoutFeed
 import Svg, { Circle, Text as SvgText } from 'react-native-svg';
 import { SharedStateContext } from '../../context';
 import { insertIntoTable, readFromTable, deleteFromTable } from '../../api';
+import { preferRendition, fetchBarMapUrl } from '../../services/renditions';
 
 const screenWidth = Dimensions.get('window').width;
 const screenHeight = Dimensions.get('window').height;
@@ -17,23 +18,20 @@ const BarMapSeatManager = ({ navigation }) => {
   const [prevSeat, setPrevSeat] = useState([]);
   const [imageLayout, setImageLayout] = useState(null);
 
-  const blobUrl = `https://datingappiotstorage.blob.core.windows.net/maps/${selectedBar}_map.png`;
-
   useEffect(() => {
     fetchMap();
   }, []);
 
   const fetchMap = async () => {
     try {
-      const response = await fetch(blobUrl);
-      if (response.ok) {
-        setMapImageUrl(`${blobUrl}?t=${new Date().getTime()}`);
+      const mapUrl = await fetchBarMapUrl(selectedBar);
+      if (mapUrl) {
+        // Seats are placed relative to the map's size, so its downscaled copy works as well
+        setMapImageUrl(await preferRendition(mapUrl, 'full'));
         setLoaded(true);
         fetchSeats(); // Fetch existing seats after loading the map
-      } else if (response.status === 404) {
-        setLoaded(false);
       } else {
-        console.error('Unexpected response status:', response.status);
+        setLoaded(false);
       }
     } catch (error) {
       console.error('Error fetching map:', error);
@@ -1,17 +1,21 @@
 import React, { useState, useEffect, useContext, useRef } from 'react';
 import { View, Text, TextInput, Button, FlatList, StyleSheet, Keyboard } from 'react-native';
 import useSignalR from '../../services/SignalRConnection';
-import { readFromTable, insertIntoTable, sendMessage } from '../../api';
+import { readFromTable, insertIntoTable, sendMessage, sendChatMessage, getChatHistory } from '../../api';
 import { SharedStateContext } from '../../context';
 import { format } from 'date-fns';
 
 
+const PAGE_SIZE = 50;
+
 const ChatScreen = ({ route }) => {
   const { otherUserEmail, otherUserName } = route.params;
   const { email, firstName, lastName, } = useContext(SharedStateContext);
   const [messages, setMessages] = useState([]);
   const [newMessage, setNewMessage] = useState('');
   const [loading, setLoading] = useState(true);  // Loading state for fetching names
+  const [before, setBefore] = useState(null); // Cursor for the next page of older messages
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const users = [email, otherUserEmail].sort();
   const userName = `${firstName} ${lastName}`;
   const { connection } = useSignalR({ onMessageReceived: async (sender, message, timestamp) => {
@@ -36,17 +40,11 @@ const ChatScreen = ({ route }) => {
   useEffect(() => {
     const fetchMessages = async () => {
     try {
-      const partitionKey = `${users[0]};${users[1]}`;
-      console.log('Fetching messages for:', partitionKey);
-      const queryFilter = `PartitionKey eq '${partitionKey}'`;
+      console.log('Fetching messages for:', `${users[0]};${users[1]}`);
       const queryLastMessage = `PartitionKey eq '${email};chat' and RowKey eq '${otherUserEmail}'`;
-      const fetchedMessages = await readFromTable('BarTable', queryFilter);
+      // Only the latest page; older messages are loaded on demand
+      const page = await getChatHistory({ user: email, otherUser: otherUserEmail, limit: PAGE_SIZE });
       const lastMessage = await readFromTable('BarTable', queryLastMessage);
-      fetchedMessages.forEach(message => {
-        if (!message.Timestamp) {
-          message.Timestamp = new Date().toISOString(); // Set a default timestamp if missing
-        }
-      });
       if (lastMessage.length > 0 && lastMessage[0].isRead === false) {
         const updatedMessage = {
           ...lastMessage[0],
@@ -55,7 +53,8 @@ const ChatScreen = ({ route }) => {
         await insertIntoTable({ tableName: 'BarTable', entity: updatedMessage, action: 'update' });
         await sendMessage({groupName: `${email};chat`, message: updatedMessage});
       }
-      setMessages(fetchedMessages.sort((a, b) => a.Timestamp.localeCompare(b.Timestamp)));
+      setMessages(page.items.slice().reverse()); // Pages come newest-first
+      setBefore(page.before);
     } catch (error) {
       console.error('Error fetching chat or user info:', error);
     } finally {
@@ -72,6 +71,24 @@ const ChatScreen = ({ route }) => {
     }
   }, [email, otherUserEmail, connection]);
 
+  const skipScrollRef = useRef(false); // Keep the position when older messages are prepended
+  const pendingSendRef = useRef(null); // The unconfirmed send, reused if the same text is sent again
+
+  const loadOlderMessages = async () => {
+    if (!before || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const page = await getChatHistory({ user: email, otherUser: otherUserEmail, limit: PAGE_SIZE, before });
+      skipScrollRef.current = true;
+      setMessages((prevMessages) => [...page.items.slice().reverse(), ...prevMessages]);
+      setBefore(page.before);
+    } catch (error) {
+      console.error('Error loading older messages:', error);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   // const handleSendMessage = () => {
   //   if (newMessage.trim()) {
   //     const timestamp = new Date().toISOString();
@@ -84,63 +101,32 @@ const ChatScreen = ({ route }) => {
 
   const handleSendMessage = async () => {
     if (newMessage.trim()) {
-      const timestamp = new Date().toISOString();
-      const StringTimestamp = format(new Date(), 'yyyy-MM-dd HH:mm:ss');
-      const users = [email, otherUserEmail].sort(); // Sort the emails
-      const partitionKey = `${users[0]};${users[1]}`; // Use sorted emails as PartitionKey
-  
-      // Check if this is the first message between the users
-      try {
-        const chatCheckQuery = `PartitionKey eq '${partitionKey}'`;
-        const chatExists = await readFromTable('BarTable', chatCheckQuery);
-        const newChatEntryForEmail = {
-          PartitionKey: `${email};chat`,
-          RowKey: otherUserEmail,
-          otherUserName: otherUserName,
-          Message: newMessage,
-          isRead: true,
-          Timestamp: timestamp,
-          StringTimestamp: StringTimestamp // Add a string timestamp for sorting
-        };
-
-        const newChatEntryForOtherUser = {
-          PartitionKey: `${otherUserEmail};chat`,
-          RowKey: email,
-          otherUserName: userName,
-          Message: newMessage,
-          isRead: false,
-          Timestamp: timestamp,
-          StringTimestamp: StringTimestamp // Add a string timestamp for sorting
+      // The server stores the message and both chat summaries, then broadcasts them.
+      // A retry sends the same id and time, so the server writes the same row again
+      if (!pendingSendRef.current || pendingSendRef.current.message !== newMessage) {
+        const now = new Date();
+        pendingSendRef.current = {
+          message: newMessage,
+          messageId: `${now.getTime().toString(36)}-${Math.random().toString(36).slice(2, 10)}`,
+          timestamp: now.toISOString(),
+          stringTimestamp: format(now, 'yyyy-MM-dd HH:mm:ss'), // Local time, as chat lists show it
         };
+      }
+      try {
+        await sendChatMessage({
+          user: email,
+          otherUser: otherUserEmail,
+          senderName: userName,
+          receiverName: otherUserName,
+          ...pendingSendRef.current,
+        });
 
-        const chatEntry = {
-          PartitionKey: partitionKey,
-          RowKey: timestamp,
-          Sender: email,
-          SenderName: userName,
-          reciverName: otherUserName,
-          Message: newMessage,
-          Timestamp: timestamp,
-          StringTimestamp: StringTimestamp
-        };
-        var action = 'update'
-        if (chatExists.length === 0) {
-          action = 'create';
-        }
-        await Promise.all([
-          insertIntoTable({ tableName: 'BarTable', entity: newChatEntryForEmail, action: action }),
-          insertIntoTable({ tableName: 'BarTable', entity: newChatEntryForOtherUser, action: action })
-        ]);
-        await insertIntoTable({ tableName: 'BarTable', entity: chatEntry });
-        // Send the actual message after the first chat entry is made
-        await sendMessage({user: email, otherUser: otherUserEmail, message: chatEntry});
-        await sendMessage({groupName: `${otherUserEmail};chat`, message:newChatEntryForOtherUser});
-
+        pendingSendRef.current = null;
         setNewMessage('');
         Keyboard.dismiss();
         scrollToEnd(); // Scroll to the bottom after sending a message
       } catch (error) {
-        console.error('Error handling first chat message:', error);
+        console.error('Error sending chat message:', error);
       }
     }
   };
@@ -202,7 +188,16 @@ const ChatScreen = ({ route }) => {
         contentContainerStyle={styles.contentContainer} // Ensure the container style allows scrolling
         showsVerticalScrollIndicator={true} // Show the vertical scrollbar
         scrollEnabled={true} // Ensure scrolling is enabled
-        onContentSizeChange={scrollToEnd} // Scroll to the bottom when content size changes
+        onContentSizeChange={() => {
+          if (skipScrollRef.current) {
+            skipScrollRef.current = false;
+            return;
+          }
+          scrollToEnd(); // Scroll to the bottom when content size changes
+        }}
+        ListHeaderComponent={before ? (
+          <Button title={loadingOlder ? 'Loading...' : 'Load earlier messages'} onPress={loadOlderMessages} disabled={loadingOlder} />
+        ) : null}
         onLayout={scrollToEnd} // Scroll to the bottom on initial render
       />
       <View style={styles.inputContainer}>
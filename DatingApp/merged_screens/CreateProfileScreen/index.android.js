@@ -3,7 +3,7 @@ import { View, TextInput, Button, StyleSheet, Text, Alert, TouchableOpacity, Ima
 import * as ImagePicker from 'expo-image-picker';
 import DateTimePicker from '@react-native-community/datetimepicker';
 import { Picker } from '@react-native-picker/picker';
-import { insertIntoTable, uploadToBlob } from '../../api';
+import { insertIntoTable, uploadDirect } from '../../api';
 import { SharedStateContext } from '../../context';
 
 export default function CreateProfileScreen({ navigation }) {
@@ -42,7 +42,7 @@ export default function CreateProfileScreen({ navigation }) {
 
     if (profilePicture) {
       try {
-        profilePictureUrl = await uploadToBlob(profilePicture, 'maps', `${email}.png`);
+        profilePictureUrl = await uploadDirect(profilePicture, 'maps', `${email}.png`);
       } catch (error) {
         Alert.alert('Error', 'Failed to upload profile picture.');
         setLoading(false);
@@ -60,6 +60,7 @@ export default function CreateProfileScreen({ navigation }) {
       biography,
       interests,
       hasProfilePicture: !!profilePictureUrl,
+      ...(profilePictureUrl ? { profilePictureUrl } : {}),
     };
     setFirstNameInState(firstName);
     setLastNameInState(lastName);
@@ -3,7 +3,7 @@ import { View, TextInput, Button, StyleSheet, Text, Alert, TouchableOpacity, Ima
 import * as ImagePicker from 'expo-image-picker';
 import DatePicker from 'react-datepicker';
 import 'react-datepicker/dist/react-datepicker.css';
-import { insertIntoTable, uploadToBlob } from '../../api';
+import { insertIntoTable, uploadDirect } from '../../api';
 import { SharedStateContext } from '../../context';
 
 export default function CreateProfileScreen({ navigation }) {
@@ -40,7 +40,7 @@ export default function CreateProfileScreen({ navigation }) {
 
     if (profilePicture) {
       try {
-        profilePictureUrl = await uploadToBlob(profilePicture, 'maps', `${email}.png`);
+        profilePictureUrl = await uploadDirect(profilePicture, 'maps', `${email}.png`);
       } catch (error) {
         Alert.alert('Error', 'Failed to upload profile picture.');
         setLoading(false);
@@ -58,6 +58,7 @@ export default function CreateProfileScreen({ navigation }) {
       biography,
       interests,
       hasProfilePicture: !!profilePictureUrl,
+      ...(profilePictureUrl ? { profilePictureUrl } : {}),
     };
     setFirstNameInState(firstName);
     setLastNameInState(lastName);
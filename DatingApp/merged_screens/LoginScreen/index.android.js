@@ -9,7 +9,7 @@ import { SharedStateContext } from '../../context';
 WebBrowser.maybeCompleteAuthSession();
 
 export default function LoginScreen({ navigation }) {
-  const { firstName, setFirstName, lastName, setLastName, email, setEmail, setManagedBars, setConnectedSeats } = useContext(SharedStateContext);
+  const { firstName, setFirstName, lastName, setLastName, email, setEmail, setAuthToken, setManagedBars, setConnectedSeats } = useContext(SharedStateContext);
   const [request, response, promptAsync] = Google.useAuthRequest({
     androidClientId: '431855682494-b42khlciqoc1pcfjt6agsqjkgnflllsj.apps.googleusercontent.com',
     expoClientId: '431855682494-pk6k7d9dsvc9l6ofr8usu2ci43veu72c.apps.googleusercontent.com',
@@ -97,6 +97,8 @@ export default function LoginScreen({ navigation }) {
       const { authentication } = response;
       fetchUserInfo(authentication.accessToken).then(email => {
         if (email) {
+          // negotiate verifies this token to tell who is connecting
+          setAuthToken(authentication.accessToken);
           setEmail(email);
         }
       });
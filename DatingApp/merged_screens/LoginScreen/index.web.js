@@ -9,7 +9,7 @@ import { SharedStateContext } from '../../context';
 WebBrowser.maybeCompleteAuthSession();
 
 export default function LoginScreen({ navigation }) {
-  const { firstName, setFirstName, lastName, setLastName, email, setEmail, setManagedBars, setConnectedSeats, setIsManager } = useContext(SharedStateContext);
+  const { firstName, setFirstName, lastName, setLastName, email, setEmail, setAuthToken, setManagedBars, setConnectedSeats, setIsManager } = useContext(SharedStateContext);
   const [request, response, promptAsync] = Google.useAuthRequest({
     expoClientId: '555320982861-7a3l35eq8pdgh8k6q7glk3ukdc6cmckj.apps.googleusercontent.com',
     webClientId: '555320982861-7a3l35eq8pdgh8k6q7glk3ukdc6cmckj.apps.googleusercontent.com',
@@ -105,6 +105,8 @@ export default function LoginScreen({ navigation }) {
       const { authentication } = response;
       fetchUserInfo(authentication.accessToken).then(email => {
         if (email) {
+          // negotiate verifies this token to tell who is connecting
+          setAuthToken(authentication.accessToken);
           setEmail(email);
         }
       });
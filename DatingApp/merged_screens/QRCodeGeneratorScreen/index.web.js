@@ -10,7 +10,6 @@ export default function QRCodeGeneratorScreen() {
   const [numQrCodes, setNumQrCodes] = useState('');
   const [qrSize, setQrSize] = useState('');
   const [loading, setLoading] = useState(false);
-  const [pdfBlob, setPdfBlob] = useState(null);
   const [showModal, setShowModal] = useState(false);
   const [modalMessage, setModalMessage] = useState('');
   const { local } = variables();
@@ -105,21 +104,15 @@ export default function QRCodeGeneratorScreen() {
   
     const pdfBlob = new Blob([doc.output('blob')], { type: 'application/pdf' });
     saveAs(pdfBlob, 'QRCode.pdf');
-    setPdfBlob(pdfBlob);
   };
   
 
   const sendPdfViaEmailHandler = async () => {
     try {
-      const reader = new FileReader();
-      reader.readAsDataURL(pdfBlob);
-      reader.onloadend = async () => {
-        const base64data = reader.result.split(',')[1];
-
-        const response = await sendPdfViaEmail(base64data, email);
-        setModalMessage('PDF sent via email successfully to ' + email);
-        setShowModal(true);
-      };
+      // The server composes the PDF for the bar's seats, so nothing is built or uploaded here
+      await sendPdfViaEmail(null, email, { bar: selectedBar, size: qrSize });
+      setModalMessage('PDF sent via email successfully to ' + email);
+      setShowModal(true);
     } catch (error) {
       console.error('Error sending PDF via email:', error);
       setModalMessage('Error: Failed to send PDF via email.');
@@ -170,9 +163,9 @@ export default function QRCodeGeneratorScreen() {
           <Text style={styles.buttonText}>Create PDF</Text>
         </TouchableOpacity>
         <TouchableOpacity
-          style={[styles.button, (loading || !pdfBlob) && styles.buttonDisabled]}
+          style={[styles.button, (loading || !selectedBar || !qrSize || isNaN(qrSize) || qrSize <= 0) && styles.buttonDisabled]}
           onPress={sendPdfViaEmailHandler}
-          disabled={loading || !pdfBlob}
+          disabled={loading || !selectedBar || !qrSize || isNaN(qrSize) || qrSize <= 0}
         >
           <Text style={styles.buttonText}>Send PDF via Email</Text>
         </TouchableOpacity>
@@ -2,7 +2,7 @@ import React, { useState, useContext, useEffect } from 'react';
 import { View, Text, StyleSheet, TouchableOpacity, Modal, ActivityIndicator, Alert } from 'react-native';
 import { BarCodeScanner } from 'expo-barcode-scanner';
 import { useNavigation } from '@react-navigation/native';
-import { insertIntoTable, readFromTable, sendMessage } from '../../api';
+import { connectToSeat } from '../../api';
 import { SharedStateContext } from '../../context';
 
 export default function MyQRCodeScannerScreen() {
@@ -48,44 +48,22 @@ export default function MyQRCodeScannerScreen() {
       return;
     }
 
-    const queryFilter = `PartitionKey eq '${barName}' and RowKey eq '${seatName}'`;
-    const seatData = await readFromTable('BarTable', queryFilter);
-    if (seatData.length === 0) {
-      console.error('The scanned seat does not exist:', data);
-      setNonExistentSeat(true);
+    // ConnectToSeat checks and claims the seat atomically and updates our seats
+    try {
+      const result = await connectToSeat({ user: email, bar: barName, seat: seatName, action: 'add' });
+      setConnectedSeats(result.connectedSeats);
+      console.log('Connected seats:', result.connectedSeats);
+    } catch (error) {
+      console.error('Could not connect to seat:', data, error);
+      if (error.status === 404) {
+        setNonExistentSeat(true);
+      } else if (error.status === 409) {
+        setOccupiedSeat(true);
+      }
       setIsLoading(false);
       setModalVisible(true);
       return;
     }
-    if (seatData.length > 0 && seatData[0].connectedUser) {
-      console.error('The scanned seat is already occupied:', data);
-      setOccupiedSeat(true);
-      setIsLoading(false);
-      setModalVisible(true);
-      return;
-    }
-
-    const updatedSeat = {
-      PartitionKey: barName,
-      RowKey: seatName,
-      connectedUser: email,
-    };
-    console.log('Updated seat:', updatedSeat);
-    await insertIntoTable({ tableName: 'BarTable', entity: updatedSeat, action: 'update' });
-
-    const updatedConnectedSeats = { ...connectedSeats, [barName]: seatName };
-    sendMessage({ groupName: `seatsChange`, message: updatedSeat });
-    setConnectedSeats(updatedConnectedSeats);
-    console.log('Connected seats:', updatedConnectedSeats);
-
-    const updatedUser = {
-      PartitionKey: 'Users',
-      RowKey: email,
-      connectedSeats: Object.entries(updatedConnectedSeats)
-        .map(([bar, seat]) => `${bar};${seat}`)
-        .join(','),
-    };
-    await insertIntoTable({ tableName: 'BarTable', entity: updatedUser, action: 'update' });
 
     setUpdateSeatSuccess(true);
     setIsLoading(false);
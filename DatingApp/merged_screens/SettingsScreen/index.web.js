@@ -3,8 +3,9 @@ import { View, Text, TextInput, Button, StyleSheet, TouchableOpacity, Image, Scr
 import * as ImagePicker from 'expo-image-picker';
 import DatePicker from 'react-datepicker';
 import 'react-datepicker/dist/react-datepicker.css';
-import { uploadToBlob, readFromTable, insertIntoTable } from '../../api';
+import { uploadDirect, readFromTable, insertIntoTable } from '../../api';
 import { SharedStateContext } from '../../context';
+import { preferRendition, profilePictureUrl } from '../../services/renditions';
 
 export default function SettingsScreen({ navigation }) {
   const [profileData, setProfileData] = useState({});
@@ -22,8 +23,8 @@ export default function SettingsScreen({ navigation }) {
       if (userData.length > 0) {
         setProfileData(userData[0]);
         if (userData[0].hasProfilePicture){
-          console.log("Profile picture exists, setting image to: " + 'https://datingappiotstorage.blob.core.windows.net/maps/' + email + '.png');
-          setImage('https://datingappiotstorage.blob.core.windows.net/maps/' + email + '.png' + '?v=' + new Date().getTime());
+          console.log("Profile picture exists, setting image to: " + profilePictureUrl(userData[0]));
+          setImage(await preferRendition(profilePictureUrl(userData[0]), 'medium'));
         }
         setBirthDate(new Date(userData[0].birthDate));  // Set the birthdate for the picker
       }
@@ -55,9 +56,10 @@ export default function SettingsScreen({ navigation }) {
     }
 
     setLoading(true);
-    let profilePictureUrl = image;
-    if (image && !image.startsWith('http')) {
-      profilePictureUrl = await uploadToBlob(image, 'maps', `${email}.png`);
+    let pictureUrl = image;
+    const pictureChanged = image && !image.startsWith('http');
+    if (pictureChanged) {
+      pictureUrl = await uploadDirect(image, 'maps', `${email}.png`);
     }
 
     const updatedProfile = {
@@ -65,13 +67,17 @@ export default function SettingsScreen({ navigation }) {
       RowKey: email,
       ...profileData,
       birthDate: birthDate.toISOString().split('T')[0],
-      hasProfilePicture: !!profilePictureUrl,
+      hasProfilePicture: !!pictureUrl,
     };
+    if (pictureChanged) {
+      updatedProfile.profilePictureUrl = pictureUrl;
+    }
 
     await insertIntoTable({ tableName: 'BarTable', entity: updatedProfile, action: 'update' });
 
-    const uniqueUrl = profilePictureUrl + '?v=' + new Date().getTime();
-    setImage(uniqueUrl);
+    if (pictureChanged) {
+      setImage(pictureUrl);
+    }
 
     setFirstName(profileData.firstName);
     setLastName(profileData.lastName);
@@ -1,8 +1,9 @@
 import React, { useState, useEffect, useContext } from 'react';
 import { View, StyleSheet, Image, Alert, Text, TouchableOpacity, ActivityIndicator, Modal } from 'react-native';
 import * as ImagePicker from 'expo-image-picker';
-import { uploadToBlob } from '../../api';
+import { uploadDirect, insertIntoTable } from '../../api';
 import { SharedStateContext } from '../../context';
+import { preferRendition, fetchBarMapUrl } from '../../services/renditions';
 
 const UploadMapScreen = () => {
   const [image, setImage] = useState(null);
@@ -11,22 +12,15 @@ const UploadMapScreen = () => {
   const [existingMap, setExistingMap] = useState(null);
   const [showModal, setShowModal] = useState(false);
   const { selectedBar } = useContext(SharedStateContext); // Get the current bar ID
-  const blobUrl = `https://datingappiotstorage.blob.core.windows.net/maps/${selectedBar}_map.png`;
-
   useEffect(() => {
     fetchExistingMap();
   }, []);
 
   const fetchExistingMap = async () => {
     try {
-      const response = await fetch(blobUrl);
-      if (response.ok) {
-        setExistingMap(`${blobUrl}?t=${new Date().getTime()}`); // Add timestamp to avoid caching
-      } else if (response.status === 404) {
-        setExistingMap(null); // Handle the case where the map doesn't exist
-      } else {
-        console.error('Unexpected response status:', response.status);
-      }
+      const mapUrl = await fetchBarMapUrl(selectedBar);
+      // Only a preview, so the smaller copy will do
+      setExistingMap(mapUrl && await preferRendition(mapUrl, 'medium'));
     } catch (error) {
       console.error('Error fetching map:', error);
     } finally {
@@ -61,7 +55,9 @@ const UploadMapScreen = () => {
     try {
       setLoading(true);
       const blobName = `${selectedBar}_map.png`;
-      const url = await uploadToBlob(image, 'maps', blobName);
+      const url = await uploadDirect(image, 'maps', blobName);
+      // Screens find the map through the bar's row
+      await insertIntoTable({ tableName: 'BarTable', entity: { PartitionKey: 'Bars', RowKey: selectedBar, mapUrl: url }, action: 'update' });
 
       Alert.alert('Map uploaded successfully', `URL: ${url}`);
       setImage(null);
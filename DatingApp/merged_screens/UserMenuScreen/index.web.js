@@ -2,7 +2,7 @@ import React, { useContext, useEffect, useState } from 'react';
 import { View, Text, StyleSheet, TouchableOpacity, Image, ActivityIndicator, Modal } from 'react-native';
 import { SharedStateContext } from '../../context';
 import { FontAwesome } from '@expo/vector-icons';
-import { insertIntoTable, sendMessage } from '../../api';
+import { connectToSeat } from '../../api';
 
 export default function UserMenuScreen({ navigation }) {
   const { email, firstName, lastName, selectedBar, selectedBarName, connectedSeats, setConnectedSeats, isManager } = useContext(SharedStateContext);
@@ -22,29 +22,9 @@ export default function UserMenuScreen({ navigation }) {
     const seatToFree = connectedSeats[selectedBar];
 
     if (seatToFree) {
-      // Free the current seat in the bar
-      const updatedSeat = {
-        PartitionKey: selectedBar,
-        RowKey: seatToFree,
-        connectedUser: '',
-      };
-      await insertIntoTable({ tableName: 'BarTable', entity: updatedSeat, action: 'update' });
-      sendMessage({ groupName: `seatsChange`, message: updatedSeat });
-      // Remove the seat from connectedSeats in the context
-      const updatedConnectedSeats = { ...connectedSeats };
-      delete updatedConnectedSeats[selectedBar];
-      setConnectedSeats(updatedConnectedSeats);
-
-      // Update the connectedSeats in the user's profile in the database
-      const connectedSeatsString = Object.entries(updatedConnectedSeats)
-        .map(([bar, seat]) => `${bar};${seat}`)
-        .join(',');
-      const updatedUser = {
-        PartitionKey: 'Users',
-        RowKey: email,
-        connectedSeats: connectedSeatsString,
-      };
-      await insertIntoTable({ tableName: 'BarTable', entity: updatedUser, action: 'update' });
+      // Free the current seat in the bar and drop it from our seats
+      const result = await connectToSeat({ user: email, bar: selectedBar, seat: seatToFree, action: 'remove' });
+      setConnectedSeats(result.connectedSeats);
 
       setShowDisconnectModal(false);
     }
@@ -6,6 +6,7 @@ import placeholderImageUrl from '../../assets/question_mark.png';
 import { readFromTable } from '../../api';
 import { SharedStateContext } from '../../context';
 import useSignalR from '../../services/SignalRConnection';
+import { preferRendition, profilePictureUrl, fetchBarMapUrl } from '../../services/renditions';
 
 
 const ViewMapScreen = ({ navigation }) => {
@@ -35,7 +36,7 @@ const ViewMapScreen = ({ navigation }) => {
         return newSeats;
       });
       setSeatsLoaded(true);
-  }, groupName: `seatsChange` });
+  }, groupName: `seatsChange`, bar: selectedBar });
 
   useEffect(() => {
     return () => {
@@ -64,8 +65,10 @@ const ViewMapScreen = ({ navigation }) => {
 
   const fetchMap = async () => {
     try {
-      const mapUrl = `https://datingappiotstorage.blob.core.windows.net/maps/${selectedBar}_map.png`;
-      setImageUrl(mapUrl + '?cache=' + new Date().getTime());
+      // Seats are placed relative to the map's size, so its downscaled copy works as well
+      const barMapUrl = await fetchBarMapUrl(selectedBar);
+      const mapUrl = barMapUrl ? await preferRendition(barMapUrl, 'full') : '';
+      setImageUrl(mapUrl);
       Image.getSize(mapUrl, (width, height) => {
         setImageDimensions({ width, height });
         setLoading(false);
@@ -126,7 +129,7 @@ const ViewMapScreen = ({ navigation }) => {
           if (userData.length > 0) {
             const user = userData[0];
             if (user.hasProfilePicture) {
-              newSeatImages[seat.RowKey] = `https://datingappiotstorage.blob.core.windows.net/maps/${user.RowKey}.png` + '?cache=' + new Date().getTime();
+              newSeatImages[seat.RowKey] = await preferRendition(profilePictureUrl(user), 'thumb');
             } else {
               const initials = `${user.firstName[0]}${user.lastName[0]}`.toUpperCase();
               const initialsImageUri = `https://ui-avatars.com/api/?name=${initials}&background=007bff&color=ffffff&size=128&format=png&rounded=true` + '?cache=' + new Date().getTime();
@@ -190,9 +193,13 @@ const ViewMapScreen = ({ navigation }) => {
 
   const showUserProfile = (connectedUser, index) => {
     const userQuery = `PartitionKey eq 'Users' and RowKey eq '${connectedUser}'`;
-    readFromTable('BarTable', userQuery).then(userData => {
+    readFromTable('BarTable', userQuery).then(async userData => {
       if (userData.length > 0) {
-        setSelectedUser(userData[0]);
+        const user = userData[0];
+        if (user.hasProfilePicture) {
+          user.pictureUrl = await preferRendition(profilePictureUrl(user), 'medium');
+        }
+        setSelectedUser(user);
         setSelectedSeat(index);
         setShowModal(true);
       }
@@ -205,7 +212,7 @@ const ViewMapScreen = ({ navigation }) => {
     if (selectedUser.hasProfilePicture) {
       return (
         <Image
-          source={{ uri: `https://datingappiotstorage.blob.core.windows.net/maps/${selectedUser.RowKey}.png` + '?cache=' + new Date().getTime() }}
+          source={{ uri: selectedUser.pictureUrl }}
           style={styles.profileImage}
         />
       );
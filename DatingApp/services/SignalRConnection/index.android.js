@@ -2,23 +2,41 @@ import { useEffect, useState, useContext } from 'react';
 import { HubConnectionBuilder, LogLevel } from '@microsoft/signalr';
 import variables from '../staticVariables';
 import { SharedStateContext } from '../../context';
+import { joinBarGroup } from '../../api';
 
-const useSignalR = ({onMessageReceived, onConnectSeat, onDisconnectSeat, groupName = "" }) => {
+// negotiate answers may be reused until the server says (Cache-Control max-age)
+const connectionInfoCache = {};
+
+const getConnectionInfo = async (url, email, authToken) => {
+  const cached = connectionInfoCache[email];
+  if (cached && cached.reuseUntil > Date.now()) {
+    return cached.connectionInfo;
+  }
+  // The server binds the connection to the user it verifies from the sign-in
+  // token, so it can message it directly
+  const response = await fetch(url, { headers: { Authorization: `Bearer ${authToken}` } });
+  if (!response.ok) {
+    throw new Error(`Negotiation error: ${response.statusText}`);
+  }
+  const connectionInfo = await response.json();
+  const maxAge = /max-age=(\d+)/.exec(response.headers.get('Cache-Control') || '');
+  if (maxAge) {
+    connectionInfoCache[email] = { connectionInfo, reuseUntil: Date.now() + Number(maxAge[1]) * 1000 };
+  }
+  return connectionInfo;
+};
+
+const useSignalR = ({onMessageReceived, onConnectSeat, onDisconnectSeat, groupName = "", bar = "" }) => {
   const [connection, setConnection] = useState(null);
   const { local } = variables();
-  const { email } = useContext(SharedStateContext)
+  const { email, authToken } = useContext(SharedStateContext)
   // const [emergencyMessage, setEmergencyMessage] = useState(null);
 
   useEffect(() => {
     const negotiate = async () => {
       try {
         url = local ? 'http://localhost:7071/api/negotiate' : 'https://functionappdatingiot.azurewebsites.net/api/negotiate';        console.log(url);
-        const response = await fetch(url);
-        if (!response.ok) {
-          throw new Error(`Negotiation error: ${response.statusText}`);
-        }
-
-        const connectionInfo = await response.json();
+        const connectionInfo = await getConnectionInfo(url, email, authToken);
 
         const newConnection = new HubConnectionBuilder()
           .withUrl(connectionInfo.url, {
@@ -29,8 +47,12 @@ const useSignalR = ({onMessageReceived, onConnectSeat, onDisconnectSeat, groupNa
           .build();
 
 
-        newConnection.onreconnected(() => {
+        newConnection.onreconnected((connectionId) => {
           console.log('Reconnected to SignalR');
+          // Group membership belongs to the old connection id
+          if (bar) {
+            joinBarGroup({ bar, connectionId });
+          }
         });
   
         newConnection.onclose(() => {
@@ -51,6 +73,13 @@ const useSignalR = ({onMessageReceived, onConnectSeat, onDisconnectSeat, groupNa
         });
       
 
+        // User-targeted messages all arrive on ReceiveMessage, with the group first
+        newConnection.on('ReceiveMessage', (group, sender, reciver, message, timestamp) => {
+          if (group === groupName && onMessageReceived) {
+            onMessageReceived(sender, message, timestamp);
+          }
+        });
+
         newConnection.on('connectSeat',(seat_id, user_id) => {
           onConnectSeat(seat_id, user_id);
         } )
@@ -60,6 +89,10 @@ const useSignalR = ({onMessageReceived, onConnectSeat, onDisconnectSeat, groupNa
         } )
 
         await newConnection.start();
+        // Seat events are only sent to the clients of their bar
+        if (bar) {
+          await joinBarGroup({ bar, connectionId: newConnection.connectionId });
+        }
         setConnection(newConnection);
       } catch (error) {
         console.error('Negotiation error:', error);
@@ -0,0 +1,45 @@
+import { Image } from 'react-native';
+import { readFromTable } from '../api';
+
+const MAPS_URL = 'https://datingappiotstorage.blob.core.windows.net/maps';
+
+// Uploaded images get smaller copies next to them (backend/shared_code/renditions.py):
+// objects/<md5>.png -> objects/<md5>_thumb.webp (128px), _medium.webp (512px), _full.webp (2048px)
+const renditionUrl = (url, rendition) => {
+  const [path, query] = url.split('?');
+  const dot = path.lastIndexOf('.');
+  const stem = dot > path.lastIndexOf('/') ? path.slice(0, dot) : path;
+  return `${stem}_${rendition}.webp` + (query ? `?${query}` : '');
+};
+
+// Resolves to the rendition's URL, or to url itself if the rendition cannot be
+// loaded (uploaded before renditions existed, or still being processed)
+const preferRendition = async (url, rendition) => {
+  const candidate = renditionUrl(url, rendition);
+  try {
+    await Image.prefetch(candidate);
+    return candidate;
+  } catch (error) {
+    return url;
+  }
+};
+
+// Uploads are content-addressed (objects/<md5>.<ext>) and rows keep their URL,
+// which never changes, so it needs no cache buster. Rows written before that
+// only say there is an image at the user's or bar's fixed name, which is
+// overwritten on every upload.
+const profilePictureUrl = (user) =>
+  user.profilePictureUrl || `${MAPS_URL}/${user.RowKey}.png?cache=${new Date().getTime()}`;
+
+// Resolves to the bar's map URL, or null if it has no map
+const fetchBarMapUrl = async (barId) => {
+  const bars = await readFromTable('BarTable', `PartitionKey eq 'Bars' and RowKey eq '${barId}'`);
+  if (bars.length > 0 && bars[0].mapUrl) {
+    return bars[0].mapUrl;
+  }
+  const legacyUrl = `${MAPS_URL}/${barId}_map.png`;
+  const response = await fetch(legacyUrl, { method: 'HEAD' });
+  return response.ok ? `${legacyUrl}?cache=${new Date().getTime()}` : null;
+};
+
+export { renditionUrl, preferRendition, profilePictureUrl, fetchBarMapUrl };